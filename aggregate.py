@@ -0,0 +1,176 @@
+# Summary statistics for the plot.py tables and figures.
+#
+# The scores are grouped once, by (date, distance, is_comp), taking the sum,
+# count, min and max of every column in a single aggregation. Every other
+# summary (by day of week, month, distance, ...) is rolled up from those
+# partial results instead of going back to the rows, so adding tables only
+# costs a groupby over the already reduced frame.
+
+import threading
+
+import numpy as np
+
+################
+## AGGREGATES ##
+################
+
+# Columns that are summarised
+VALUES = ["arrow_average", "distance", "arrows", "golds_pct"]
+STATS = ["sum", "count", "min", "max"]
+
+# How each partial result combines when rolled up to a coarser grouping
+COMBINE = {"sum": "sum", "count": "sum", "min": "min", "max": "max"}
+
+# Keys every rollup can be grouped by
+BASE_KEYS = ["date", "distance", "is_comp"]
+DATE_KEYS = {
+    "year": lambda date: date.dt.year,
+    "month": lambda date: date.dt.month,
+    "day_of_week": lambda date: date.dt.day_of_week,
+}
+
+class Aggregates:
+
+    def __init__(self, score_data):
+        self.rows = len(score_data)
+        # Distances are categories in frames from the store; they are summed
+        # here for the mean distance, so they need to be numbers
+        score_data = score_data.assign(distance=score_data.distance.astype("float64"))
+        base = score_data.groupby(BASE_KEYS, sort=False).agg(
+            rows=("date", "size"),
+            **{f"{col}_{stat}": (col, stat) for col in VALUES for stat in STATS})
+        self._set_base(base.reset_index())
+
+    # From partial results grouped by BASE_KEYS somewhere else, eg. by 
+    # SqliteScoreStore.aggregate()
+    @classmethod
+    def from_base(cls, base):
+        import pandas as pd
+        aggregates = cls.__new__(cls)
+        aggregates.rows = int(base.rows.sum())
+        aggregates._set_base(base.assign(date=pd.to_datetime(base.date)))
+        return aggregates
+
+    def _set_base(self, base):
+        for key, part in DATE_KEYS.items():
+            base[key] = part(base.date)
+        self.base = base
+        self._rollups = {}
+
+    # Partial results combined up to 'keys', computed once per set of keys
+    def rollup(self, keys):
+        keys = tuple(keys)
+        if keys not in self._rollups:
+            how = {"rows": "sum"}
+            for col in VALUES:
+                for stat in STATS:
+                    how[f"{col}_{stat}"] = COMBINE[stat]
+            self._rollups[keys] = self.base.groupby(list(keys)).agg(how)
+        return self._rollups[keys]
+
+    def _stat(self, keys, columns, stat):
+        rollup = self.rollup(keys)
+        frame = rollup[[f"{col}_{stat}" for col in columns]]
+        frame.columns = list(columns)
+        return frame
+
+    def mean(self, keys, columns):
+        sums = self._stat(keys, columns, "sum")
+        counts = self._stat(keys, columns, "count")
+        return sums / counts
+
+    def sum(self, keys, columns):
+        return self._stat(keys, columns, "sum")
+
+    def min(self, keys, columns):
+        return self._stat(keys, columns, "min")
+
+    def max(self, keys, columns):
+        return self._stat(keys, columns, "max")
+
+    # Number of scores in each group
+    def count(self, keys):
+        return self.rollup(keys)["rows"]
+
+###################
+## ROLLUP TABLES ##
+###################
+
+# Columns kept in the rollup tables
+ROLLUP_VALUES = ["arrow_average", "arrows", "golds_pct"]
+# Rollup periods, by the length of the ISO date ("2023-04-16") they keep
+PERIODS = {"day": 10, "month": 7}
+
+# Count, sum and sum of squares of each of ROLLUP_VALUES per (distance, day)
+# and per (distance, month), kept up to date as scores are added
+# Built once from a frame of scores; add() then updates one entry in each
+# table, so means, variances and totals never need the rows again.
+# Each entry is an array of [count, sum, sum of squares, sum, ...].
+class Rollups:
+
+    def __init__(self):
+        self._tables = {period: {} for period in PERIODS}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_frame(cls, score_data):
+        rollups = cls()
+        values = score_data[ROLLUP_VALUES].astype("float64")
+        columns = {"count": np.ones(len(score_data))}
+        for column in ROLLUP_VALUES:
+            columns[f"{column}_sum"] = values[column].to_numpy()
+            columns[f"{column}_sumsq"] = values[column].to_numpy() ** 2
+        frame = values.assign(**columns)[list(columns)]
+        frame["distance"] = score_data.distance.astype("float64").round(2).to_numpy()
+        frame["day"] = score_data.date.dt.strftime("%Y-%m-%d").to_numpy()
+
+        # Months are rolled up from the days rather than the rows
+        days = frame.groupby(["distance", "day"]).sum()
+        for period, length in PERIODS.items():
+            table = days.groupby([
+                days.index.get_level_values("distance"),
+                days.index.get_level_values("day").str[:length]]).sum()
+            rollups._tables[period] = {
+                key: entry for key, entry in zip(table.index, table.to_numpy())}
+        return rollups
+
+    # A single score row, with the store's columns
+    def add(self, row):
+        golds_pct = row["golds"] / row["arrows"] * 100
+        values = np.array([row["arrow_average"], row["arrows"], golds_pct], dtype=float)
+        entry = np.empty(1 + 2 * len(values))
+        entry[0] = 1
+        entry[1::2] = values
+        entry[2::2] = values ** 2
+
+        distance = round(float(row["distance"]), 2)
+        day = str(np.datetime64(row["date"], "D"))
+        with self._lock:
+            for period, length in PERIODS.items():
+                key = (distance, day[:length])
+                table = self._tables[period]
+                if key in table:
+                    table[key] += entry
+                else:
+                    table[key] = entry.copy()
+
+    # Count and the total, mean and sample variance of each column, for every
+    # (distance, period) in order
+    def summary(self, period="month"):
+        with self._lock:
+            entries = sorted(
+                (key, entry.copy()) for key, entry in self._tables[period].items())
+        rows = []
+        for (distance, when), entry in entries:
+            count = entry[0]
+            row = {"distance": distance, period: when, "count": int(count)}
+            for i, column in enumerate(ROLLUP_VALUES):
+                total, total_sq = entry[1 + 2 * i], entry[2 + 2 * i]
+                mean = total / count
+                row[f"{column}_total"] = float(total)
+                row[f"{column}_mean"] = float(mean)
+                # Sample variance, as pandas' var(); undefined for one score
+                row[f"{column}_var"] = float(
+                    max(total_sq - count * mean ** 2, 0) / (count - 1)) if count > 1 else None
+            rows.append(row)
+        return rows
@@ -1,72 +1,242 @@
-import pandas as pd
+from flask import Flask, render_template, redirect, url_for, session, request, jsonify, \
+    Response, abort, stream_template
 
-from sklearn import linear_model
-from sklearn.model_selection import train_test_split
-
-from flask import Flask, render_template, redirect, url_for, session
-
-from forms import GetScoreData, GetNewScore
+from forms import GetScoreData, GetNewScore, seasons, distances, unit_choices
+from cache import LRUCache
+from store import open_store, ARCHER_PATTERN, COLUMNS, DEFAULT_ARCHER, SORTS
+from history import ScoreHistory
+from writer import ScoreWriter
+from snapshot import snapshot_key, load_or_build
+from training import TrainedModel, train, FEATURES, TEST_SIZE, RANDOM_STATE
+from registry import ModelRegistry
+from retrain import RetrainScheduler
+from grid import GridCache
+from aggregate import Rollups, PERIODS
+from figures import FIGURES, FORMATS, render
+import export
+import bulk
 
 from datetime import date
+import io
+import os
+
+import numpy as np
 
 ###############
 ## APP SETUP ##
 ###############
 
-# Define constants
-YEAR = date.today().strftime("%y")
-
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'mysecret'
 
+# Where scores are kept: "csv" for the original static/*.csv files, 
+# "parquet" for typed columnar files partitioned by season and year or 
+# "sqlite" for an indexed database which also sorts and groups the scores
+app.config['SCORE_STORE'] = os.environ.get("SCORE_STORE", "csv")
+store = open_store(app.config['SCORE_STORE'], "static")
+
+# All writes go through the writer so that concurrent submissions from 
+# several workers are batched and never interleave
+writer = ScoreWriter(store)
+
+# Seconds add_score() waits for its score to be written before giving up
+app.config['WRITE_TIMEOUT'] = 30
+
+# Memory cap for every year of each season's scores, read and combined on
+# first use and re-read one year at a time as scores are added
+app.config['HISTORY_CACHE_BYTES'] = 128 * 1024 * 1024
+history = ScoreHistory(store, app.config['HISTORY_CACHE_BYTES'])
+
+# Rows per page of the results table, and the most a request can ask for
+app.config['RESULTS_PAGE_SIZE'] = 50
+app.config['MAX_RESULTS_PAGE_SIZE'] = 500
+
+# Memory cap for the sort indexes used by results()
+app.config['SORT_INDEX_BYTES'] = 64 * 1024 * 1024
+sort_indexes = LRUCache(
+    app.config['SORT_INDEX_BYTES'], sizeof=lambda entry: entry[1].nbytes)
+
 ###########################################
 ## DATA PRE-PROCESSING AND LIN REG MODEL ##
 ###########################################
 
-# Load dataframe
-# Then, convert the 'date' column to be datetypes 
-score_data = pd.read_csv(f"static/arrow_scores_outdoors_{YEAR}.csv", header=0)
-score_data.date = pd.to_datetime(score_data.date)
-
-# Create a column of the calculated percent of gold arrows (arrows scoring >9)
-score_data["golds_pct"] = (score_data.golds / score_data.arrows)*100
-
-# Create a column indicating the time elapsed since the first entry
-# This is used as a feature to show progress over time
-score_data["days_since_first_entry"] = (
-    score_data.date - min(score_data.date) ).dt.days
-
-# Get the most recent entry to the .csv file.
-# This is displayed in "index.html" for the user to calculate the desired 
-# days till feature since this date.
-# Create dataframe column converting the datetime object to a day of 
-# week string
-most_recent_date = max(score_data.date).strftime("%Y-%m-%d")
-score_data["day_of_week"] = score_data.date.dt.day_of_week
-
-# Select features to predict FROM and features to predict TO
-features = score_data[["distance","days_since_first_entry","is_comp"]]
-scored = score_data[["arrow_average","golds_pct"]]
-
-# Split the data into training and testing subsets
-# This ensures there is 'real' data left unseen by the model which can be 
-# used to score the models accuracy.
-# THERE IS A DANGER HERE: if the 20% testing subset includes the very few datapoints with
-# "is_comp" equal to 1 then the model will have no values to train this feature on.
-# To resolve this issue I need more data, however this is obviously easier said than done...
-X_train, X_test, y_train, y_test = train_test_split(
-    features, scored, test_size = 0.2, random_state = 864)
-
-# Creates the LinReg model and trains it with the training subset
-model = linear_model.LinearRegression()
-model.fit(X_train, y_train)
-
-# Score the model
-# This is done on training AND testing data to highlight overfitting
-train_score = model.score(X_train, y_train)
-test_score = model.score(X_test, y_test)
-print(f"Train Model Score: {train_score}")
-print(f"Test Model Score: {test_score}\n")
+# Trained models are saved under here, keyed by a hash of their training data
+app.config['MODEL_DIR'] = "models"
+# "numpy" for the built-in least squares model or "sklearn" for
+# sklearn.linear_model.LinearRegression, see regression.py
+app.config['REGRESSION_BACKEND'] = os.environ.get("REGRESSION_BACKEND", "numpy")
+# Maximum number of (season, feature set, archer) models kept in memory
+# The least recently used archers' models are dropped beyond this
+app.config['MAX_MODELS'] = 64
+# Seconds a season's scores must stop changing before its model is refit
+app.config['RETRAIN_DEBOUNCE'] = 2.0
+
+# Load an archer's model for a season, trained on every year of their scores
+# If the scores have not changed since the model was last trained, the
+# saved snapshot is loaded; otherwise the scores are read and the model is 
+# refit, see training.py
+def load_model(season, features, archer=DEFAULT_ARCHER):
+    backend = app.config['REGRESSION_BACKEND']
+    key = snapshot_key(
+        history.digest(season, archer), 
+        features, TEST_SIZE, RANDOM_STATE, backend)
+    name = f"{archer}_{season}_{snapshot_key(features)[:8]}"
+    arrays = load_or_build(
+        app.config['MODEL_DIR'], name, key, 
+        lambda: train(history.read(season, archer), features, backend).to_arrays())
+    trained = TrainedModel.from_arrays(arrays)
+
+    print(f"{archer} {season.title()} Train Model Score: {trained.train_score}")
+    print(f"{archer} {season.title()} Test Model Score: {trained.test_score}\n")
+    return trained
+
+# Models are trained lazily, the first time a season is predicted for
+# When other workers add scores, models are refit in the background and 
+# swapped in once they have been validated
+models = ModelRegistry(history, load_model, app.config['MAX_MODELS'])
+models.scheduler = RetrainScheduler(
+    models, debounce=app.config['RETRAIN_DEBOUNCE'])
+
+# Recent predictions, keyed by the inputs and the version of the model which 
+# made them. Retraining or updating a model changes its version, so stale 
+# entries are never hit again and age out of the cache.
+app.config['PREDICTION_CACHE_SIZE'] = 4096
+prediction_cache = LRUCache(app.config['PREDICTION_CACHE_SIZE'])
+
+# Predict (arrow_average, golds_pct) for a single set of inputs
+def predict_one(trained, distance, days, is_comp):
+    version = trained.model.version
+    key = (version, round(distance, 4), int(days), bool(is_comp))
+    guess = prediction_cache.get(key)
+    if guess is None:
+        guess = trained.model.predict([[distance, days, is_comp]])[0]
+        # Don't cache if the model was updated while predicting
+        if trained.model.version == version:
+            prediction_cache.put(key, guess)
+    # Copy so callers can sanitise the output without changing the cache
+    return guess.copy()
+
+# "cache" to memoise predictions as they are made, or "grid" to precompute 
+# every prediction index() can make whenever a model changes, falling back to
+# predict_one() for inputs off the grid
+app.config['PREDICTION_MODE'] = os.environ.get("PREDICTION_MODE", "cache")
+# Days either side of the most recent entry covered by the grid
+app.config['GRID_HORIZON'] = 366
+grids = GridCache(
+    distances, [float(unit) for unit, _ in unit_choices], 
+    app.config['GRID_HORIZON'], app.config['MAX_MODELS'])
+
+# An archer's scores for a season and the order of its rows for 'sort', as
+# positions into the frame
+# The order is built once per sort and reused for every page until the
+# history's frame changes, so a page only costs taking its own rows
+def load_sort_index(season, sort, archer=DEFAULT_ARCHER):
+    score_data = history.read(season, archer)
+    entry = sort_indexes.get((season, archer, sort))
+    if entry is None or entry[0] is not score_data:
+        by, ascending = SORTS[sort]
+        order = score_data[by].reset_index(drop=True).sort_values(
+            by=by, ascending=ascending, kind="stable").index.to_numpy()
+        entry = (score_data, order)
+        sort_indexes.put((season, archer, sort), entry)
+    return entry
+
+# Score rows formatted for display
+# Dates are formatted back to strings
+def format_rows(rows):
+    rows = rows[COLUMNS].copy()
+    rows["date"] = rows.date.dt.strftime("%Y-%m-%d")
+    # Averages are held as float32; show them as the 2dp they were saved as
+    rows["arrow_average"] = rows.arrow_average.astype(float).round(2)
+    return rows
+
+# Rows 'start' to 'stop' of an archer's scores for a season in 'sort' order,
+# and the number of scores
+# Stores which can sort (see SqliteScoreStore.read_sorted) read just the
+# page from their index; otherwise it is taken from the cached sort index
+def load_results_page(season, sort, start, stop, archer=DEFAULT_ARCHER):
+    if hasattr(store, "read_sorted"):
+        rows = store.read_sorted(season, sort, start, stop - start, archer=archer)
+        return format_rows(rows), store.count(season, archer)
+    score_data, order = load_sort_index(season, sort, archer)
+    return format_rows(score_data.take(order[start:stop])), len(order)
+
+# Rows formatted per chunk when every score is streamed by results()
+app.config['RESULTS_STREAM_CHUNK'] = 1000
+
+# Every row of an archer's scores for a season in 'sort' order, formatted a
+# chunk at a time as the template asks for them, and the number of scores
+def load_all_results(season, sort, archer=DEFAULT_ARCHER):
+    chunk = app.config['RESULTS_STREAM_CHUNK']
+    if hasattr(store, "read_sorted"):
+        total = store.count(season, archer)
+        chunks = store.read_sorted_chunks(season, sort, archer=archer, chunk_rows=chunk)
+    else:
+        score_data, order = load_sort_index(season, sort, archer)
+        total = len(order)
+        chunks = (
+            score_data.take(order[start:start + chunk])
+            for start in range(0, len(order), chunk))
+    rows = (row for rows in chunks for row in format_rows(rows).values.tolist())
+    return rows, total
+
+# Template variables shared by every page of results()
+def results_context(season, archer, sort, total):
+    # No figures until there are some scores to plot
+    figures = []
+    if total:
+        figures = [
+            url_for("figure", season=season, name=name, fmt="png", archer=archer)
+            for name in FIGURES]
+    return dict(
+        season = season.title(),
+        archer = archer,
+        figures = figures,
+        sort = sort,
+        total = total,
+        url_season = season,
+    )
+
+# Memory cap for rendered figure images
+app.config['FIGURE_CACHE_BYTES'] = 16 * 1024 * 1024
+figure_cache = LRUCache(app.config['FIGURE_CACHE_BYTES'], sizeof=len)
+# Content hash of each season's scores, remembered until the partition changes
+digest_cache = LRUCache(256)
+
+def season_digest(season, archer=DEFAULT_ARCHER):
+    key = (season, archer, history.token(season, archer))
+    digest = digest_cache.get(key)
+    if digest is None:
+        digest = history.digest(season, archer)
+        digest_cache.put(key, digest)
+    return digest
+
+# Render a figure from figures.py for an archer's season
+# Images are cached under a hash of the scores and the plot parameters, so
+# a figure is only redrawn once new scores have been added
+def load_figure(season, name, fmt, dpi, archer=DEFAULT_ARCHER):
+    key = snapshot_key(season_digest(season, archer), name, fmt, dpi)
+    image = figure_cache.get(key)
+    if image is None:
+        score_data = history.read(season, archer)
+        image = render(
+            name, score_data, history.aggregates(season, archer), fmt, dpi)
+        figure_cache.put(key, image)
+    return key, image
+
+# Per (distance, day) and (distance, month) totals of each archer's season,
+# built from the history once and then updated by add_score()
+app.config['MAX_ROLLUPS'] = 64
+rollups = LRUCache(app.config['MAX_ROLLUPS'])
+
+def load_rollups(season, archer=DEFAULT_ARCHER):
+    token = history.token(season, archer)
+    entry = rollups.get((season, archer))
+    # Rebuilt if another worker has added scores since
+    if entry is None or entry[0] != token:
+        entry = (token, Rollups.from_frame(history.read(season, archer)))
+        rollups.put((season, archer), entry)
+    return entry[1]
 
 ##################
 ## FLASK ROUTES ##
@@ -80,6 +250,7 @@ def index():
     # On submission...
     if get_score_data.validate_on_submit():
         # Getters for form data
+        archer = get_score_data.archer.data
         season = get_score_data.season.data
         distance = get_score_data.distance.data
         units = get_score_data.units.data
@@ -91,15 +262,32 @@ def index():
         # Sanitise input
         distance, days_till, units = float(distance), float(days_till), float(units)
         distance *= units
+
+        # There is nothing to train a model on until the archer adds a score
+        if history.token(season, archer) is None:
+            get_score_data.archer.errors.append(
+                f"No {season} scores have been added for {archer} yet")
+            return render_template(
+                "index.html", 
+                get_score_data=get_score_data
+            )
+        trained = models.get(season, FEATURES, archer)
         
-        # Use the trained model to predict output variables from input variables
-        # max(score_data.days_since_first_entry) + days_till 
+        # Use the trained model for the selected season to predict output 
+        # variables from input variables
+        # trained.latest_day + days_till 
         # --> Most recent entry to .csv file + user specified number of days
-        guesses = model.predict(
-            [[distance, 
-              max(score_data.days_since_first_entry) + days_till, 
-              is_comp]]
-        )
+        guess = None
+        if app.config['PREDICTION_MODE'] == "grid":
+            guess = grids.get((season, tuple(FEATURES), archer), trained).lookup(
+                distance, trained.latest_day + days_till, is_comp)
+        if guess is None:
+            guess = predict_one(
+                trained,
+                distance, 
+                trained.latest_day + days_till, 
+                is_comp)
+        guesses = [guess]
         
         # Sanitise output
         # Max possible score is 10
@@ -158,6 +346,7 @@ def add_score():
     # On submission...
     # Get values from submitted form
     if get_new_score.validate_on_submit():
+        archer = get_new_score.archer.data
         season = get_new_score.season.data
         arrow_average = get_new_score.arrow_average.data
         distance = get_new_score.distance.data
@@ -167,25 +356,55 @@ def add_score():
         total_arrows = get_new_score.total_arrows.data
         is_comp = get_new_score.is_comp.data
         
-        # Initialise file path
-        file_path = f"static/arrow_scores_{season}_{YEAR}.csv"
-
         # Convert to yards
         # If metres selected in dropdown, units is 1.09... to convert into yards
         # If yards selected in dropdown, unit is 1 --> no change
         distance = int(distance) * float(units)
         
-        # Write to the relevant .csv file
-        to_write = f'\n{arrow_average:.2f},{distance:.2f},"{date}",{golds},{total_arrows},{is_comp}'
-        with open(file_path, "a+") as file:
-            file.write(to_write)
+        # Write to the archer's partition for the season and the year the
+        # score was shot in
+        # Blocks until the row is on disk, sharing the fsync with any other
+        # scores submitted at the same time
+        row = {
+            "arrow_average": float(arrow_average),
+            "distance": distance,
+            "date": date,
+            "golds": golds,
+            "arrows": total_arrows,
+            "is_comp": int(is_comp),
+        }
+        year = date.strftime("%y")
+        # Caches are only brought up to date if they were before this write
+        before = history.token(season, archer)
+        try:
+            writer.write(season, year, [row], archer, app.config['WRITE_TIMEOUT'])
+        # Including TimeoutError, which is an OSError
+        except OSError as error:
+            get_new_score.archer.errors.append(f"The score could not be saved: {error}")
+            return render_template(
+                "add_score.html",
+                get_new_score = get_new_score
+            ), 503
+        history.bump(season, year, archer)
+        
+        # Feed the new score into any loaded models for this archer's season
+        # so it is used by the next prediction
+        models.observe(season, row, before, archer)
+        # Rollups which had missed another worker's scores are rebuilt instead
+        entry = rollups.peek((season, archer))
+        if entry is not None and entry[0] == before:
+            entry[1].add(row)
+            rollups.put((season, archer), (history.token(season, archer), entry[1]))
+        elif entry is not None:
+            rollups.pop((season, archer))
         
         # Redirect to the 'display' route for the relevant season
         return redirect(url_for(
             'results',
             _external=True, 
             scheme='https',
-            season=season
+            season=season,
+            archer=archer
         ))
         
     return render_template(
@@ -196,17 +415,281 @@ def add_score():
 # Display Results For Outdoor/Indoor Season
 # http://127.0.0.1:5000/display/outdoors
 # http://127.0.0.1:5000/display/indoors
+# http://127.0.0.1:5000/display/outdoors/<archer>
+# http://127.0.0.1:5000/display/outdoors/<archer>?sort=date&page=2&per_page=100
+# http://127.0.0.1:5000/display/outdoors/<archer>?page=all
 @app.route('/results/<season>', methods=["GET","POST"])
-def results(season):
+@app.route('/results/<season>/<archer>', methods=["GET","POST"])
+def results(season, archer=DEFAULT_ARCHER):
     season = season.strip("/")
-    # Open dataframe for selected season of current year
-    # Sort by distance and by average arrow score
-    score_data = pd.read_csv(f"static/arrow_scores_{season}_{YEAR}.csv")
-    score_data = score_data.sort_values(
-        by=["distance","arrow_average"], 
-        ascending=[True, False])
+    sort = request.args.get("sort", "distance")
+    if season not in dict(seasons) or not ARCHER_PATTERN.fullmatch(archer):
+        abort(404)
+    if sort not in SORTS:
+        abort(404)
+    per_page = request.args.get("per_page", app.config['RESULTS_PAGE_SIZE'], type=int)
+    per_page = min(max(per_page, 1), app.config['MAX_RESULTS_PAGE_SIZE'])
+
+    # page=all streams every row: the template is sent as it renders, with
+    # rows formatted a chunk at a time, so the first bytes go out straight
+    # away and the whole page is never held in memory
+    if request.args.get("page") == "all":
+        score_data, total = load_all_results(season, sort, archer)
+        return stream_template(
+            "results.html",
+            **results_context(season, archer, sort, total),
+            score_data = score_data,
+            page = 1,
+            pages = 1,
+            per_page = per_page,
+        )
+
+    page = request.args.get("page", 1, type=int)
+    if page < 1:
+        abort(404)
+    # Only the requested page of every year of the archer's selected season
+    # is read or taken from the cached sort index
+    score_data, total = load_results_page(
+        season, sort, (page - 1) * per_page, page * per_page, archer)
+    pages = max(-(-total // per_page), 1)
+    if page > pages:
+        abort(404)
     return render_template(
         "results.html",
-        season = season.title(),
-        score_data = score_data.values.tolist()
-    ) 
\ No newline at end of file
+        **results_context(season, archer, sort, total),
+        score_data = score_data.values.tolist(),
+        page = page,
+        pages = pages,
+        per_page = per_page,
+    )
+
+# Figures
+# http://127.0.0.1:5000/figures/outdoors/distance_fig.png
+# http://127.0.0.1:5000/figures/indoors/month_fig.svg?dpi=200&archer=<archer>
+@app.route('/figures/<season>/<name>.<fmt>', methods=["GET"])
+def figure(season, name, fmt):
+    archer = request.args.get("archer", DEFAULT_ARCHER)
+    if season not in dict(seasons) or name not in FIGURES or fmt not in FORMATS:
+        abort(404)
+    if not ARCHER_PATTERN.fullmatch(archer) or history.token(season, archer) is None:
+        abort(404)
+    # Keep the resolution within sensible bounds so that one request can't
+    # fill the cache with huge images
+    dpi = min(max(request.args.get("dpi", 100, type=int), 50), 300)
+    key, image = load_figure(season, name, fmt, dpi, archer)
+    response = Response(image, mimetype=FORMATS[fmt])
+    response.set_etag(key)
+    return response.make_conditional(request)
+
+##############
+## JSON API ##
+##############
+
+# Rows predicted at most by one api_predict() request
+app.config['MAX_PREDICT_ROWS'] = 10000
+
+# Batch Score Predictions
+# http://127.0.0.1:5000/api/predict
+# POST {"season": "outdoors", "distances": [20, 30], "dates": ["2023-10-01"],
+#       "is_comp": [0], "units": 1, "archer": "default"}
+# Each field is a list (or a single value) and they are broadcast against 
+# each other, so one date can be used with every distance in a season plan.
+# All rows are predicted with a single call to model.predict, up to
+# MAX_PREDICT_ROWS of them
+@app.route('/api/predict', methods=["POST"])
+def api_predict():
+    body = request.get_json(silent=True) or {}
+    if not isinstance(body, dict):
+        return jsonify(error="The request body must be a JSON object"), 400
+    season = body.get("season", "outdoors")
+    if not isinstance(season, str) or season not in dict(seasons):
+        return jsonify(error=f"Unknown season: {season}"), 400
+    archer = body.get("archer", DEFAULT_ARCHER)
+    if not isinstance(archer, str) or not ARCHER_PATTERN.fullmatch(archer):
+        return jsonify(error=f"Invalid archer: {archer}"), 400
+    if history.token(season, archer) is None:
+        return jsonify(error=f"No {season} scores for {archer}"), 404
+    try:
+        distances = np.asarray(body["distances"], dtype=float)
+        on_dates = np.asarray(body["dates"], dtype="datetime64[D]")
+        is_comp = np.asarray(body.get("is_comp", 0), dtype=float)
+        units = np.asarray(body.get("units", 1), dtype=float)
+        fields = [distances, on_dates, is_comp, units]
+        # Nested lists would broadcast into a grid of every combination
+        if any(field.ndim > 1 for field in fields):
+            return jsonify(error="Each field must be a list or a single value"), 400
+        shape = np.broadcast_shapes(*(field.shape for field in fields))
+        if shape and shape[0] > app.config['MAX_PREDICT_ROWS']:
+            return jsonify(
+                error=f"At most {app.config['MAX_PREDICT_ROWS']} rows can be predicted"), 400
+        distances, on_dates, is_comp, units = np.broadcast_arrays(*fields)
+    except KeyError as missing:
+        return jsonify(error=f"Missing field: {missing}"), 400
+    except (TypeError, ValueError) as error:
+        return jsonify(error=str(error)), 400
+    # nulls become NaN / NaT, which can't be predicted from (or sent as JSON)
+    if not (np.isfinite(distances).all() and np.isfinite(is_comp).all()
+            and np.isfinite(units).all() and not np.isnat(on_dates).any()):
+        return jsonify(error="Every value must be a finite number or a date"), 400
+
+    # Same features as index(): distance in yards and the days from the
+    # most recent entry to the .csv file
+    distances = (distances * units).ravel()
+    on_dates = on_dates.ravel()
+    days_till = (np.datetime64(date.today(), "D") - on_dates).astype(float)
+    is_comp = is_comp.ravel()
+
+    trained = models.get(season, FEATURES, archer)
+    guesses = trained.model.predict(np.column_stack([
+        distances, trained.latest_day + days_till, is_comp]))
+
+    # Sanitise output
+    # Max possible score is 10
+    # Max gold_pct is 100%
+    return jsonify(
+        distances = distances.tolist(),
+        dates = on_dates.astype(str).tolist(),
+        is_comp = is_comp.astype(bool).tolist(),
+        avg_score = np.clip(guesses[:, 0], None, 10).tolist(),
+        gold_pct = np.clip(guesses[:, 1], 0, 100).tolist(),
+    )
+
+# Season Summary
+# http://127.0.0.1:5000/api/summary/outdoors
+# http://127.0.0.1:5000/api/summary/indoors?period=day&archer=<archer>
+# Count, total, mean and variance of each score column per distance and 
+# month (or day), served from the rollup tables without reading any scores
+@app.route('/api/summary/<season>', methods=["GET"])
+def api_summary(season):
+    period = request.args.get("period", "month")
+    archer = request.args.get("archer", DEFAULT_ARCHER)
+    if season not in dict(seasons) or period not in PERIODS:
+        return jsonify(error=f"Unknown season or period: {season}, {period}"), 400
+    if not ARCHER_PATTERN.fullmatch(archer):
+        return jsonify(error=f"Invalid archer: {archer}"), 400
+    return jsonify(summary = load_rollups(season, archer).summary(period))
+
+# Rows read from the store at a time by api_export()
+app.config['EXPORT_CHUNK_ROWS'] = 10000
+
+# Score Export
+# http://127.0.0.1:5000/api/export/outdoors
+# http://127.0.0.1:5000/api/export/outdoors?format=ndjson&years=2022-2023&archer=<archer>
+# http://127.0.0.1:5000/api/export/outdoors?years=23
+# http://127.0.0.1:5000/api/export/indoors?columns=date,arrow_average&distance=20&is_comp=1
+# http://127.0.0.1:5000/api/export/outdoors?from=2023-05-01&to=2023-06-30
+# Streams the scores as CSV or newline delimited JSON, read from the store
+# and filtered one chunk of rows at a time
+@app.route('/api/export/<season>', methods=["GET"])
+def api_export(season):
+    fmt = request.args.get("format", "csv")
+    archer = request.args.get("archer", DEFAULT_ARCHER)
+    if season not in dict(seasons) or fmt not in export.FORMATS:
+        return jsonify(error=f"Unknown season or format: {season}, {fmt}"), 400
+    if not ARCHER_PATTERN.fullmatch(archer):
+        return jsonify(error=f"Invalid archer: {archer}"), 400
+    columns = request.args.get("columns", ",".join(COLUMNS)).split(",")
+    if not set(columns) <= set(COLUMNS):
+        return jsonify(error=f"Unknown columns: {set(columns) - set(COLUMNS)}"), 400
+    try:
+        # A single year (2023 or 23) or a range of them (2022-2024 or 22-24)
+        first, _, last = request.args.get("years", "").partition("-")
+        first = export.parse_year(first) if first else None
+        last = export.parse_year(last) if last else first
+        start, end = (
+            date.fromisoformat(request.args[name]) if name in request.args else None
+            for name in ["from", "to"])
+        # Parsed here rather than with type=, which drops values it can't
+        # convert and so would export every row
+        distances = [float(distance) for distance in request.args.getlist("distance")]
+        is_comp = request.args.get("is_comp")
+        is_comp = int(is_comp) if is_comp is not None else None
+        if is_comp not in (None, 0, 1):
+            raise ValueError(f"is_comp must be 0 or 1: {is_comp}")
+    except ValueError as error:
+        return jsonify(error=str(error)), 400
+
+    # Years outside the dates asked for are never read
+    if start is not None:
+        first = max(first or start.year, start.year)
+    if end is not None:
+        last = min(last or end.year, end.year)
+    years = export.partition_years(store.partitions(season, archer), first, last)
+    # The columns being filtered on are read as well as the ones exported
+    filtered = set(columns)
+    if distances:
+        filtered.add("distance")
+    if start is not None or end is not None:
+        filtered.add("date")
+    if is_comp is not None:
+        filtered.add("is_comp")
+    read_columns = [column for column in COLUMNS if column in filtered]
+
+    chunks = store.read_chunks(
+        season, years, read_columns, archer, app.config['EXPORT_CHUNK_ROWS'])
+    rows = (
+        export.filter_chunk(chunk, distances, start, end, is_comp) for chunk in chunks)
+    return Response(
+        export.encode(rows, fmt, columns), mimetype=export.FORMATS[fmt],
+        headers={"Content-Disposition":
+                 f"attachment; filename={archer}_{season}.{fmt}"})
+
+# Bulk Score Import
+# http://127.0.0.1:5000/api/import/outdoors?archer=<archer>
+# POST a CSV or newline delimited JSON file as 'file' in a form, or as the
+# request body with ?format=csv|ndjson
+# Columns: arrow_average, distance, date, golds, arrows and optionally
+# is_comp and units (as the add_score() form)
+# Every row is validated before any are written; then they are all written
+# at once and the models and caches are refreshed once for the whole upload
+@app.route('/api/import/<season>', methods=["POST"])
+def api_import(season):
+    archer = request.args.get("archer", DEFAULT_ARCHER)
+    if season not in dict(seasons):
+        return jsonify(error=f"Unknown season: {season}"), 400
+    if not ARCHER_PATTERN.fullmatch(archer):
+        return jsonify(error=f"Invalid archer: {archer}"), 400
+    upload = request.files.get("file")
+    if upload is not None:
+        fmt = request.args.get("format", os.path.splitext(upload.filename)[1].lstrip("."))
+        file = upload.stream
+    else:
+        fmt = request.args.get("format", "csv")
+        file = request.stream
+    if fmt not in bulk.FORMATS:
+        return jsonify(error=f"Unknown format: {fmt}"), 400
+
+    try:
+        scores, errors, failed = bulk.read_upload(io.TextIOWrapper(file, "utf-8"), fmt)
+    except ValueError as error:
+        return jsonify(error=str(error)), 400
+    if failed:
+        return jsonify(
+            error=f"{failed} rows failed validation, nothing was imported",
+            rows=[{"row": row, "error": message} for row, message in errors]), 400
+    if not len(scores):
+        return jsonify(error="There are no scores to import"), 400
+
+    before = history.token(season, archer)
+    try:
+        written = bulk.write_scores(store, season, scores, archer)
+    except OSError as error:
+        return jsonify(error=f"The scores could not be saved: {error}"), 503
+    for year in written:
+        history.bump(season, year, archer)
+    models.observe_many(season, scores, before, archer)
+    # Rebuilt from the history the next time they are asked for
+    rollups.pop((season, archer))
+    return jsonify(imported=len(scores), years=written)
+
+# Cache Statistics
+# http://127.0.0.1:5000/api/stats
+@app.route('/api/stats', methods=["GET"])
+def api_stats():
+    return jsonify(
+        prediction_cache = prediction_cache.stats(),
+        sort_indexes = sort_indexes.stats(),
+        history = history.stats(),
+        figure_cache = figure_cache.stats(),
+        models = len(models),
+    )
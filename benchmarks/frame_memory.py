@@ -0,0 +1,90 @@
+# USAGE
+# python benchmarks/frame_memory.py
+# python benchmarks/frame_memory.py --rows 1000000
+#
+# python benchmarks/frame_memory.py --years 5
+#
+# Writes a season of random scores to a temporary store, split across
+# '--years' yearly partitions which each have a different set of distances,
+# then compares reading it with pandas' inferred types (as the app used to)
+# against ScoreHistory.read() with the compact schema in store.DTYPES.
+# Reports the parse time and the memory used by the combined frame with its
+# derived columns.
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from cache import frame_nbytes
+from history import ScoreHistory
+from store import COLUMNS, CsvScoreStore
+
+DISTANCES = [20, 30, 40, 50, 60, 70 * 1.09361, 80]
+
+def write_scores(store, rows, years):
+    rng = np.random.default_rng(864)
+    for i in range(years):
+        year_rows = rows // years
+        # Each year leaves out a different distance
+        distances = rng.choice(
+            [d for j, d in enumerate(DISTANCES) if years == 1 or j != i % len(DISTANCES)],
+            year_rows)
+        arrows = rng.choice([24, 30, 36, 48], year_rows)
+        frame = pd.DataFrame({
+            "arrow_average": np.clip(
+                9.5 - distances / 40 + rng.normal(0, 0.4, year_rows), 0, 10),
+            "distance": distances,
+            "date": pd.Timestamp(f"{2015 + i}-01-01")
+                + pd.to_timedelta(rng.integers(0, 365, year_rows), "D"),
+            "golds": rng.integers(0, arrows + 1),
+            "arrows": arrows,
+            "is_comp": rng.integers(0, 2, year_rows),
+        })
+        frame.to_csv(store.path("outdoors", f"{15 + i}"), index=False,
+                     columns=COLUMNS, float_format="%.2f")
+
+# The score frame as it was read before the schema was added
+def read_inferred(store):
+    frame = pd.concat([
+        pd.read_csv(store.path("outdoors", year), header=0)
+        for _, year in store.partitions("outdoors")], ignore_index=True)
+    frame["date"] = pd.to_datetime(frame["date"])
+    frame["golds_pct"] = (frame.golds / frame.arrows) * 100
+    frame["days_since_first_entry"] = (frame.date - min(frame.date)).dt.days
+    frame["day_of_week"] = frame.date.dt.day_of_week
+    return frame
+
+# Every year combined, as the app holds it
+def read_schema(store):
+    return ScoreHistory(store).read("outdoors")
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare score frame memory and parse time")
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        store = CsvScoreStore(root)
+        write_scores(store, args.rows, args.years)
+        print(f"{args.rows} rows over {args.years} years\n")
+        print(f"{'reader':<10}{'parse ms':>10}{'memory MB':>12}")
+        for name, reader in [("inferred", read_inferred), ("schema", read_schema)]:
+            times = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                frame = reader(store)
+                times.append(time.perf_counter() - start)
+            print(f"{name:<10}{min(times) * 1000:>10.1f}{frame_nbytes(frame) / 1e6:>12.2f}"
+                  f"  distance {frame.distance.dtype}")
+
+if __name__ == "__main__":
+    main()
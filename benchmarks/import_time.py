@@ -0,0 +1,62 @@
+# USAGE
+# python benchmarks/import_time.py
+# python benchmarks/import_time.py --max-ms 400 app
+#
+# Imports each module in a fresh interpreter with `python -X importtime` and
+# reports the total import cost, plus which of the heavy dependencies were
+# pulled in and what they cost. Exits non-zero if a module is over --max-ms
+# so that startup regressions can be caught.
+
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = ["app", "forms", "store", "training", "plot", "sight_markings.sight_markings"]
+HEAVY = ["numpy", "pandas", "sklearn", "matplotlib", "seaborn", "pyarrow"]
+
+# {module: cumulative microseconds} for the top-level imports of a module
+def import_times(module):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr}")
+
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        # Only keep the first (outermost) time a package is imported
+        times.setdefault(name.strip(), int(cumulative))
+    return times
+
+def main():
+    parser = argparse.ArgumentParser(description="Report import cost per module")
+    parser.add_argument("modules", nargs="*", default=MODULES)
+    parser.add_argument("--max-ms", type=float,
+                        help="fail if any module takes longer than this to import")
+    args = parser.parse_args()
+
+    over_budget = []
+    print(f"{'module':<32}{'total ms':>10}  heavy dependencies")
+    for module in args.modules:
+        times = import_times(module)
+        total_ms = times[module] / 1000
+        heavy = ", ".join(
+            f"{name} {times[name] / 1000:.0f}ms" for name in HEAVY if name in times)
+        print(f"{module:<32}{total_ms:>10.1f}  {heavy or '-'}")
+        if args.max_ms is not None and total_ms > args.max_ms:
+            over_budget.append(module)
+
+    if over_budget:
+        print(f"\nOver the {args.max_ms}ms budget: {', '.join(over_budget)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# USAGE
+# python benchmarks/regression_latency.py
+# python benchmarks/regression_latency.py --repeat 500 --season indoors
+#
+# Times fit(), partial_fit() with a single new score and a single-row
+# predict() for each regression backend on the real score data, so the
+# per-call overhead of sklearn can be compared against the numpy backend.
+# Both backends predict with LinearModel.predict, the same numpy matmul on
+# their fitted coefficients, so their predict columns time the same code.
+# The "estimator" row times sklearn's LinearRegression fit() and predict()
+# themselves, which is what predicting through sklearn would cost.
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import time
+
+import numpy as np
+
+from regression import BACKENDS, make_regressor
+from store import CsvScoreStore
+from training import FEATURES, TARGETS, add_derived_columns
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Median microseconds per call
+def time_call(call, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        times.append(time.perf_counter() - start)
+    return np.median(times) * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare regression backend latency")
+    parser.add_argument("--season", default="outdoors", choices=["indoors", "outdoors"])
+    parser.add_argument("--year", default="23")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    score_data = add_derived_columns(
+        CsvScoreStore(os.path.join(ROOT, "static")).read(args.season, [args.year]))
+    X = score_data[FEATURES].to_numpy(dtype=float)
+    y = score_data[TARGETS].to_numpy(dtype=float)
+    print(f"{len(X)} rows, {args.repeat} calls each\n")
+
+    print(f"{'backend':<10}{'fit us':>12}{'partial_fit us':>16}{'predict us':>12}")
+    for backend in sorted(BACKENDS):
+        model = make_regressor(backend)
+        fit = time_call(lambda: model.fit(X, y), args.repeat)
+        # partial_fit grows the model, so start from the same fit every call
+        partial = time_call(
+            lambda: make_regressor(backend).fit(X, y).partial_fit(X[:1], y[:1]),
+            args.repeat) - fit
+        predict = time_call(lambda: model.predict(X[:1]), args.repeat)
+        print(f"{backend:<10}{fit:>12.1f}{partial:>16.1f}{predict:>12.1f}")
+
+    from sklearn import linear_model
+    estimator = linear_model.LinearRegression()
+    fit = time_call(lambda: estimator.fit(X, y), args.repeat)
+    predict = time_call(lambda: estimator.predict(X[:1]), args.repeat)
+    print(f"{'estimator':<10}{fit:>12.1f}{'-':>16}{predict:>12.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+import argparse
+import os
+
+from forms import MAX_ARROW_AVERAGE, distances, seasons, unit_choices
+from store import COLUMNS, DEFAULT_ARCHER, check_archer, open_store
+
+# Bulk import of scores from a CSV or newline delimited JSON upload, eg. a
+# season exported from a scoring app (or from /api/export).
+# Rows are validated in batches with the same rules as forms.GetNewScore, as
+# whole columns rather than one form at a time, and every row is written to
+# the store in one go. See the /api/import route in app.py.
+
+FORMATS = ["csv", "ndjson"]
+
+# Rows read and validated at a time
+BATCH_ROWS = 10000
+# Failing rows reported back, beyond which they are only counted
+MAX_ERRORS = 100
+
+# Columns of an upload, as the store's columns plus the optional 'units'
+# (1 for yards, 1.09361 for metres, see forms.py) which distances are in
+REQUIRED = ["arrow_average", "distance", "date", "golds", "arrows"]
+OPTIONAL = {"is_comp": 0, "units": 1}
+
+################
+## VALIDATION ##
+################
+
+# Batches of an upload as frames of unparsed values
+def read_batches(file, fmt="csv", batch_rows=BATCH_ROWS):
+    import pandas as pd
+    if fmt == "csv":
+        return pd.read_csv(file, dtype=str, chunksize=batch_rows)
+    if fmt == "ndjson":
+        return pd.read_json(file, lines=True, dtype=False, convert_dates=False,
+                            chunksize=batch_rows)
+    raise ValueError(f"Unknown import format: {fmt}")
+
+# Validate a batch of an upload
+# Returns the rows as they are written to the store (with distances in
+# yards) and [(row number, message), ...] for any rows which fail; the first
+# row of the batch is numbered 'first_row'
+def validate_batch(batch, first_row=1):
+    import pandas as pd
+
+    missing = [column for column in REQUIRED if column not in batch]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+    for column, default in OPTIONAL.items():
+        if column not in batch:
+            batch = batch.assign(**{column: default})
+
+    def number(column):
+        return pd.to_numeric(batch[column], errors="coerce")
+    arrow_average, distance, units = number("arrow_average"), number("distance"), number("units")
+    golds, arrows, is_comp = number("golds"), number("arrows"), number("is_comp")
+    on_date = pd.to_datetime(batch["date"], format="%Y-%m-%d", errors="coerce")
+
+    # Same as GetNewScore's validators; DataRequired rejects a 0 as well
+    failures = {
+        f"arrow_average must be a non-zero number up to {MAX_ARROW_AVERAGE}":
+            ~((arrow_average != 0) & (arrow_average <= MAX_ARROW_AVERAGE)),
+        f"distance must be one of {distances}": ~distance.isin(distances),
+        f"units must be one of {[unit for unit, _ in unit_choices]}":
+            ~units.isin([unit for unit, _ in unit_choices]),
+        "date must be a date as YYYY-MM-DD": on_date.isna(),
+        "golds must be a non-zero whole number": ~((golds != 0) & (golds % 1 == 0)),
+        "arrows must be a non-zero whole number": ~((arrows != 0) & (arrows % 1 == 0)),
+        "is_comp must be 0 or 1": ~is_comp.isin([0, 1]),
+    }
+    errors = []
+    for message, failed in failures.items():
+        for position in failed.to_numpy().nonzero()[0]:
+            errors.append((first_row + int(position), message))
+
+    scores = pd.DataFrame({
+        "arrow_average": arrow_average,
+        "distance": distance * units,
+        "date": on_date,
+        "golds": golds,
+        "arrows": arrows,
+        "is_comp": is_comp,
+    })
+    return scores, sorted(errors)
+
+# Read and validate every batch of an upload
+# Returns (scores, errors, number of failing rows) with at most MAX_ERRORS
+# errors; the scores should only be written if there are none
+def read_upload(file, fmt="csv", batch_rows=BATCH_ROWS):
+    import pandas as pd
+
+    frames, errors, failed = [], [], 0
+    first_row = 1
+    for batch in read_batches(file, fmt, batch_rows):
+        scores, batch_errors = validate_batch(batch, first_row)
+        first_row += len(batch)
+        failed += len({row for row, _ in batch_errors})
+        errors.extend(batch_errors[:MAX_ERRORS - len(errors)])
+        # Failing batches are not kept, as nothing will be written
+        if not failed:
+            frames.append(scores)
+    scores = pd.concat(frames, ignore_index=True) if frames else \
+        pd.DataFrame(columns=COLUMNS)
+    return scores, errors, failed
+
+#############
+## WRITING ##
+#############
+
+# Write validated scores to their archer's partitions for 'season' and the
+# year each score was shot in
+# Every partition is written while holding the store's lock once, and in a
+# single transaction where the store supports it (see
+# SqliteScoreStore.append_many). Returns {year: number of rows}.
+def write_scores(store, season, scores, archer=DEFAULT_ARCHER):
+    check_archer(archer)
+    years = {}
+    for year, rows in scores.groupby(scores.date.dt.strftime("%y"), sort=True):
+        # Plain values, as the .csv store writes them with format strings
+        years[year] = rows.assign(
+            arrow_average=rows.arrow_average.astype(float),
+            distance=rows.distance.astype(float),
+            date=rows.date.dt.date,
+        )[COLUMNS].astype({"golds": int, "arrows": int, "is_comp": int}) \
+            .to_dict("records")
+    with store.lock():
+        if hasattr(store, "append_many"):
+            store.append_many(season, years, archer)
+        else:
+            for year, rows in years.items():
+                store.append(season, year, rows, archer)
+    return {year: len(rows) for year, rows in years.items()}
+
+if __name__ == "__main__":
+    # python bulk.py --season outdoors --archer robin scores.csv
+    # A running app sees the new scores through the partitions' change
+    # tokens and refits its models in the background, see retrain.py
+    parser = argparse.ArgumentParser(description="Import scores from a file")
+    parser.add_argument("path")
+    parser.add_argument("--season", required=True, choices=dict(seasons))
+    parser.add_argument("--archer", default=DEFAULT_ARCHER)
+    parser.add_argument("--format", choices=FORMATS,
+                        help="format of the file (default: from its extension)")
+    parser.add_argument("--store", default=os.environ.get("SCORE_STORE", "csv"),
+                        help="score store backend, as SCORE_STORE for the app")
+    args = parser.parse_args()
+
+    fmt = args.format or os.path.splitext(args.path)[1].lstrip(".")
+    with open(args.path) as file:
+        scores, errors, failed = read_upload(file, fmt)
+    if failed:
+        for row, message in errors:
+            print(f"Row {row}: {message}")
+        raise SystemExit(f"{failed} rows failed validation, nothing was imported")
+    if not len(scores):
+        raise SystemExit("There are no scores to import")
+    written = write_scores(open_store(args.store, "static"), args.season, scores, args.archer)
+    for year, count in written.items():
+        print(f"{args.season} {year}: {count} scores")
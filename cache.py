@@ -0,0 +1,126 @@
+import threading
+from collections import OrderedDict
+
+###############
+## LRU CACHE ##
+###############
+
+# Thread-safe least-recently-used cache with a size cap
+# 'sizeof' gives the cost of each value towards 'max_size'; by default every
+# entry costs 1 so 'max_size' is simply the maximum number of entries.
+# The least recently used entries are evicted until the total fits the cap.
+class LRUCache:
+
+    def __init__(self, max_size, sizeof=lambda value: 1):
+        self.max_size = max_size
+        self._sizeof = sizeof
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.total_size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key][0]
+
+    # Look up 'key' without marking it as used or counting a hit/miss
+    def peek(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            return default if entry is None else entry[0]
+
+    def put(self, key, value):
+        size = self._sizeof(value)
+        with self._lock:
+            if key in self._entries:
+                self.total_size -= self._entries.pop(key)[1]
+            # Values larger than the whole cache are never stored
+            if size > self.max_size:
+                return
+            self._entries[key] = (value, size)
+            self.total_size += size
+            while self.total_size > self.max_size:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.total_size -= evicted_size
+
+    def pop(self, key, default=None):
+        with self._lock:
+            if key not in self._entries:
+                return default
+            value, size = self._entries.pop(key)
+            self.total_size -= size
+            return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_size = 0
+
+    def keys(self):
+        with self._lock:
+            return list(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "size": self.total_size,
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+#################
+## FRAME CACHE ##
+#################
+
+# Deep memory usage of a dataframe in bytes, used as the LRU entry size
+def frame_nbytes(frame):
+    return int(frame.memory_usage(index=True, deep=True).sum())
+
+# Cache of parsed dataframes keyed by (season, year)
+# Each entry remembers the store's change token for its partition (the file's
+# mtime and size). add_score() bumps a key after writing, which drops its
+# entry so that a new score is picked up even if it lands within the
+# filesystem's mtime resolution. A single count of bumps (rather than one per
+# key, which would grow with every archer ever written to) stops a load which
+# was already running during a bump from caching what it read.
+class FrameCache:
+
+    def __init__(self, max_bytes):
+        self._lru = LRUCache(max_bytes, sizeof=lambda entry: frame_nbytes(entry[1]))
+        self._lock = threading.Lock()
+        self._bumps = 0
+
+    def bump(self, key):
+        with self._lock:
+            self._bumps += 1
+            self._lru.pop(key)
+
+    # Return the cached frame for 'key', calling 'loader()' to (re)build it
+    # when there is no entry or 'token' has changed since it was cached
+    def get(self, key, token, loader):
+        bumps = self._bumps
+        entry = self._lru.get(key)
+        if entry is not None and entry[0] == token:
+            return entry[1]
+        frame = loader()
+        with self._lock:
+            # A write during the load may not be in the frame
+            if self._bumps == bumps:
+                self._lru.put(key, (token, frame))
+        return frame
+
+    def stats(self):
+        return self._lru.stats()
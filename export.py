@@ -0,0 +1,77 @@
+import numpy as np
+
+from store import COLUMNS
+
+# Score exports, streamed a chunk of rows at a time from the store so that the
+# whole history is never held in memory. See the /api/export route in app.py.
+
+FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+#############
+## FILTERS ##
+#############
+
+# A year asked for as 2023, or as 23 like the partitions are named
+def parse_year(text):
+    year = int(text)
+    if year < 100:
+        return 2000 + year
+    if year < 1000:
+        raise ValueError(f"Invalid year: {text}")
+    return year
+
+# Partition years ("23") of 'first' to 'last' (2023 to 2024), either of which
+# can be None to leave that end open
+def partition_years(partitions, first=None, last=None):
+    years = []
+    for _, year in partitions:
+        full_year = 2000 + int(year)
+        if (first is None or full_year >= first) and (last is None or full_year <= last):
+            years.append(year)
+    return years
+
+# Rows of a chunk which match every filter given
+# 'distances' in yards, 'start' and 'end' dates inclusive, 'is_comp' 0 or 1
+def filter_chunk(chunk, distances=None, start=None, end=None, is_comp=None):
+    masks = []
+    if distances:
+        masks.append(chunk.distance.astype("float64").round(2).isin(
+            [round(distance, 2) for distance in distances]))
+    if start is not None:
+        masks.append(chunk.date >= np.datetime64(start, "D"))
+    if end is not None:
+        masks.append(chunk.date <= np.datetime64(end, "D"))
+    if is_comp is not None:
+        masks.append(chunk.is_comp == is_comp)
+    if not masks:
+        return chunk
+    keep = masks[0]
+    for mask in masks[1:]:
+        keep = keep & mask
+    return chunk[keep]
+
+##############
+## ENCODING ##
+##############
+
+# Chunks of scores as the text of a CSV file or newline delimited JSON,
+# with only 'columns' and in their order
+def encode(chunks, fmt="csv", columns=COLUMNS):
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    if fmt == "csv":
+        yield ",".join(columns) + "\n"
+    for chunk in chunks:
+        if not len(chunk):
+            continue
+        chunk = chunk[columns].copy()
+        # Written as they are saved: 2dp floats and ISO dates
+        for column in ["arrow_average", "distance"]:
+            if column in chunk:
+                chunk[column] = chunk[column].astype("float64").round(2)
+        if "date" in chunk:
+            chunk["date"] = chunk.date.dt.strftime("%Y-%m-%d")
+        if fmt == "csv":
+            yield chunk.to_csv(header=False, index=False)
+        else:
+            yield chunk.to_json(orient="records", lines=True).rstrip("\n") + "\n"
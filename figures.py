@@ -0,0 +1,173 @@
+import io
+import threading
+
+import numpy as np
+
+# matplotlib and seaborn are slow to import, so they are only imported when a
+# figure is actually drawn.
+# Figures are drawn with the object-oriented API on a Figure with its own
+# Agg canvas, so nothing depends on pyplot's global state or a display.
+
+# matplotlib's artists are not thread-safe, so one figure is drawn at a time
+_draw_lock = threading.Lock()
+
+FORMATS = {"png": "image/png", "svg": "image/svg+xml"}
+
+# Above this many scores the scatterplots are drawn as 2D histograms instead
+# of one marker per score, so drawing time doesn't grow with the history
+DENSITY_THRESHOLD = 5000
+DENSITY_BINS = 60
+
+#############
+## FIGURES ##
+#############
+
+# Counts of scores in a grid of 'x' by 'y' bins, binned with numpy and drawn
+# as a single mesh, in place of a scatterplot with one marker per score
+# Dates are binned as seconds since the epoch and converted back for the axis
+# With 'hue', each bin is instead coloured by the mean hue of its scores on
+# 'cmap' between 'hue_range', and fades out the fewer scores it holds
+def _density(ax, x, y, bins=DENSITY_BINS, hue=None, cmap="cool", hue_range=None,
+             label="Scores"):
+    from matplotlib.colors import LogNorm, Normalize
+
+    is_date = np.issubdtype(x.dtype, np.datetime64)
+    if is_date:
+        x = x.astype("int64").astype(float)
+    counts, x_edges, y_edges = np.histogram2d(x, y, bins=bins)
+    if hue is not None:
+        totals, _, _ = np.histogram2d(x, y, bins=[x_edges, y_edges], weights=hue)
+    if is_date:
+        x_edges = x_edges.astype("int64").astype("datetime64[s]")
+
+    if hue is None:
+        mesh = ax.pcolormesh(x_edges, y_edges, np.ma.masked_equal(counts, 0).T,
+                             cmap=cmap, norm=LogNorm())
+    else:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            means = np.ma.masked_invalid(totals / counts)
+        alpha = 0.3 + 0.7 * np.log1p(counts) / np.log1p(counts.max())
+        mesh = ax.pcolormesh(x_edges, y_edges, means.T, cmap=cmap,
+                             norm=Normalize(*hue_range), alpha=alpha.T)
+    ax.figure.colorbar(mesh, ax=ax, label=label)
+    if is_date:
+        ax.figure.autofmt_xdate()
+
+# Scatterplot of distance against arrow average
+# Style: O markers if not competition, X markers if is competition
+# Hue: Change colour of marker depending on day of week of shoot,
+# uses 'cmap' to discern colours
+def _plot_by_hue(ax, score_data, aggregates, hue, cmap, hue_range, label, density):
+    import seaborn as sns
+
+    if density:
+        _density(ax, score_data.distance.to_numpy(float),
+                 score_data.arrow_average.to_numpy(float),
+                 hue=hue.to_numpy(float), cmap=cmap, hue_range=hue_range,
+                 label=f"Mean {label}")
+    else:
+        sns.scatterplot(
+            data = score_data,
+            x = "distance", y = "arrow_average",
+            style = "is_comp",
+            hue = hue,
+            palette = cmap,
+            ax = ax,
+        )
+
+    # Plot lines for min / avg / max arrow scores at each distance
+    distance_max = aggregates.max(["distance"], ["arrow_average"])
+    distance_mean = aggregates.mean(["distance"], ["arrow_average"])
+    distance_min = aggregates.min(["distance"], ["arrow_average"])
+    ax.plot(distance_max.index, distance_max.arrow_average, "k:")
+    ax.plot(distance_mean.index, distance_mean.arrow_average, "g--")
+    ax.plot(distance_min.index, distance_min.arrow_average, "k:")
+
+    # Figure labels
+    ax.set_xlabel("Distance")
+    ax.set_ylabel("Average Arrow Score")
+
+# graphs/day_of_week_fig.png
+def day_of_week_fig(ax, score_data, aggregates, density=False):
+    from matplotlib import colormaps
+    _plot_by_hue(ax, score_data, aggregates,
+                 score_data.day_of_week, colormaps["cool"].resampled(7), (0, 6),
+                 "day of week", density)
+
+# graphs/month_fig.png
+def month_fig(ax, score_data, aggregates, density=False):
+    from matplotlib import colormaps
+    _plot_by_hue(ax, score_data, aggregates,
+                 score_data.date.dt.month, colormaps["cool"].resampled(12), (1, 12),
+                 "month", density)
+
+# graphs/distance_fig.png
+def distance_fig(ax, score_data, aggregates, density=False):
+    from matplotlib import colormaps
+    import seaborn as sns
+
+    averages = aggregates.mean(["distance"], ["arrow_average"]).arrow_average
+    cmap = colormaps["tab10"].resampled(len(averages))
+    if density:
+        _density(ax, score_data.date.to_numpy("datetime64[s]"),
+                 score_data.arrow_average.to_numpy(float))
+    else:
+        sns.scatterplot(
+            data = score_data,
+            x = "date", y = "arrow_average",
+            style = "is_comp",
+            hue = "distance",
+            # Distances are categories, which take a list of colours
+            palette = list(cmap.colors),
+            ax = ax,
+        )
+
+    for i, avg in enumerate(averages):
+        ax.axhline(avg, color=cmap.colors[i], alpha=0.7, linestyle=':')
+
+    # 252 Scheme Boundaries
+    ax.axhline(280 / 36, color='k', linestyle="dashed", linewidth=0.9) # Compound
+    ax.axhline(252 / 36, color='k', linestyle="dashed", linewidth=0.9) # Recurve
+
+# graphs/arrows_per_day.png
+# Already one point per day, so there is no density version
+def arrows_per_day(ax, score_data, aggregates, density=False):
+    per_day = aggregates.sum(["date"], ["arrows"]).arrows
+    ax.plot(per_day.index, per_day.values)
+
+# Every figure, by the name of the file plot.py saves it as
+FIGURES = {
+    "day_of_week_fig": day_of_week_fig,
+    "month_fig": month_fig,
+    "distance_fig": distance_fig,
+    "arrows_per_day": arrows_per_day,
+}
+
+# Resolution plot.py saves each figure at, if not matplotlib's default of 100
+SAVE_DPI = {"distance_fig": 500}
+
+###############
+## RENDERING ##
+###############
+
+# Draw a figure and return the encoded image as bytes
+# 'density' defaults to on for more than DENSITY_THRESHOLD scores
+def render(name, score_data, aggregates, fmt="png", dpi=100, density=None):
+    from matplotlib.figure import Figure
+
+    if name not in FIGURES:
+        raise ValueError(f"Unknown figure: {name}")
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown figure format: {fmt}")
+
+    if density is None:
+        density = len(score_data) > DENSITY_THRESHOLD
+
+    with _draw_lock:
+        # A bare Figure uses the Agg canvas when saved, whatever the
+        # pyplot backend is
+        fig = Figure()
+        FIGURES[name](fig.add_subplot(), score_data, aggregates, density)
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format=fmt, dpi=dpi)
+    return buffer.getvalue()
@@ -1,19 +1,43 @@
 from flask_wtf import FlaskForm
-from wtforms import SubmitField, IntegerField, BooleanField, DecimalField, DateField, SelectField
-from wtforms.validators import DataRequired, NumberRange
+from wtforms import SubmitField, IntegerField, BooleanField, DecimalField, DateField, SelectField, StringField
+from wtforms.validators import DataRequired, NumberRange, Regexp
 from datetime import date
 
+from store import ARCHER_PATTERN, DEFAULT_ARCHER
+
 distances = [10, 18, 20, 30, 40, 50, 60, 70, 80, 90, 100, ]
 
+seasons = [
+    ("outdoors", "Outdoor"), 
+    ("indoors", "Indoor")]
+
+# Highest possible average arrow score
+MAX_ARROW_AVERAGE = 10
+
 # 1.09361 = yard --> metre conversion
+unit_choices = [
+    (1, "yds"), 
+    (1.09361, "m")]
+
+# Whose scores to use, see store.py
+# Names are lower-cased and may only use a-z, 0-9 and '-'
+def archer_field():
+    return StringField(
+        "Archer: ",
+        validators=[
+            DataRequired(),
+            Regexp(ARCHER_PATTERN.pattern + r"\Z", 
+                   message="Use up to 32 letters, numbers or '-'")],
+        filters=[lambda name: name.strip().lower() if name else name],
+        default=DEFAULT_ARCHER)
 
 class GetScoreData(FlaskForm):
     
+    archer = archer_field()
+    
     season = SelectField(
         "Season: ", 
-        choices=[
-            ("outdoors", "Outdoor"), 
-            ("indoors", "Indoor")], 
+        choices=seasons, 
         validators=[DataRequired()], 
         default=0)
     
@@ -24,9 +48,7 @@ class GetScoreData(FlaskForm):
     
     units = SelectField(
         "Units: ", 
-        choices=[
-            (1, "yds"), 
-            (1.09361, "m")], 
+        choices=unit_choices, 
         validators=[DataRequired()], 
         default=1)
     
@@ -41,18 +63,18 @@ class GetScoreData(FlaskForm):
     
 class GetNewScore(FlaskForm):
     
+    archer = archer_field()
+    
     season = SelectField(
         "Season: ", 
-        choices=[
-            ("outdoors", "Outdoor"), 
-            ("indoors", "Indoor")], 
+        choices=seasons, 
         validators=[DataRequired()])
     
     arrow_average = DecimalField(
         "Average Arrow Score: ", 
         validators=[
             DataRequired(), 
-            NumberRange(max=10)])
+            NumberRange(max=MAX_ARROW_AVERAGE)])
     
     distance = SelectField(
         "Distance", 
@@ -62,9 +84,7 @@ class GetNewScore(FlaskForm):
     
     units = SelectField(
         "Units: ", 
-        choices=[
-            (1, "yds"), 
-            (1.09361, "m")], 
+        choices=unit_choices, 
         validators=[DataRequired()], 
         default=1)
     
@@ -0,0 +1,71 @@
+import numpy as np
+
+from cache import LRUCache
+
+#####################
+## PREDICTION GRID ##
+#####################
+
+# Every prediction index() can make, computed up front
+# The inputs index() feeds the model are small and discrete:
+# - distance: one of forms.distances, in yards or converted from metres
+# - days since first entry: the most recent entry +/- 'horizon' days
+# - is_comp: 0 or 1
+# (only models using those three features can be put on a grid)
+# so the full tensor of predictions over distance x day x is_comp is built
+# with one matrix multiply whenever the model changes, and requests are
+# answered by indexing into it.
+class PredictionGrid:
+
+    def __init__(self, trained, distances, units, horizon=366):
+        coef, intercept, self.version = trained.model.parameters()
+        self.latest_day = trained.latest_day
+
+        yards = sorted({round(d * u, 4) for d in distances for u in units})
+        self._distance_index = {distance: i for i, distance in enumerate(yards)}
+        self.first_day = trained.latest_day - horizon
+        days = np.arange(self.first_day, trained.latest_day + horizon + 1)
+
+        # Feature tensor of shape (distance, day, is_comp, feature)
+        axes = {
+            "distance": np.array(yards, dtype=float),
+            "days_since_first_entry": days.astype(float),
+            "is_comp": np.array([0.0, 1.0]),
+        }
+        grids = np.meshgrid(
+            axes["distance"], axes["days_since_first_entry"], axes["is_comp"],
+            indexing="ij")
+        by_name = dict(zip(axes, grids))
+        features = np.stack([by_name[name] for name in trained.features], axis=-1)
+
+        # Shape (distance, day, is_comp, target)
+        self.predictions = features @ coef.T + intercept
+
+    def is_current(self, trained):
+        return (self.version == trained.model.version and
+                self.latest_day == trained.latest_day)
+
+    # Prediction for one set of inputs, or None if they are off the grid
+    def lookup(self, distance, days, is_comp):
+        i = self._distance_index.get(round(distance, 4))
+        j = int(days) - self.first_day
+        if i is None or not 0 <= j < self.predictions.shape[1]:
+            return None
+        return self.predictions[i, j, int(bool(is_comp))].copy()
+
+# Grids for the most recently used models, rebuilt when a model changes
+class GridCache:
+
+    def __init__(self, distances, units, horizon=366, max_grids=8):
+        self.distances = distances
+        self.units = units
+        self.horizon = horizon
+        self._grids = LRUCache(max_grids)
+
+    def get(self, key, trained):
+        grid = self._grids.get(key)
+        if grid is None or not grid.is_current(trained):
+            grid = PredictionGrid(
+                trained, self.distances, self.units, self.horizon)
+            self._grids.put(key, grid)
+        return grid
@@ -0,0 +1,71 @@
+from aggregate import Aggregates
+from cache import FrameCache
+from store import DEFAULT_ARCHER, apply_schema
+from training import add_derived_columns
+
+###################
+## SCORE HISTORY ##
+###################
+
+# Every year of an archer's scores for a season as one frame
+# The partitions are found in the store rather than assuming the current
+# year, and each one is only read when it is first needed or has changed
+# since it was last read, so adding a score re-reads one year, not all of them.
+# The derived columns are added to the combined frame, so
+# days_since_first_entry counts from the archer's first score in ANY year.
+# Frames are shared between requests and must not be modified.
+class ScoreHistory:
+
+    def __init__(self, store, max_bytes=64 * 1024 * 1024):
+        self.store = store
+        # Split between the single years and the combined frames
+        self._years = FrameCache(max_bytes // 2)
+        self._combined = FrameCache(max_bytes // 2)
+
+    # ((year, token), ...) for every partition, None if there are none
+    # Changes whenever a partition is added or written to
+    def token(self, season, archer=DEFAULT_ARCHER):
+        years = self.years(season, archer)
+        if not years:
+            return None
+        return tuple(
+            (year, self.store.token(season, year, archer)) for year in years)
+
+    def years(self, season, archer=DEFAULT_ARCHER):
+        return [year for _, year in self.store.partitions(season, archer)]
+
+    def digest(self, season, archer=DEFAULT_ARCHER):
+        return self.store.digest(season, self.years(season, archer), archer)
+
+    # Mark a partition as written to, see FrameCache.bump()
+    def bump(self, season, year, archer=DEFAULT_ARCHER):
+        self._years.bump((season, year, archer))
+        self._combined.bump((season, archer))
+
+    def read(self, season, archer=DEFAULT_ARCHER):
+        token = self.token(season, archer)
+        return self._combined.get(
+            (season, archer), token,
+            lambda: self._combine(season, archer, token or ()))
+
+    def _combine(self, season, archer, token):
+        import pandas as pd
+        frames = [
+            self._years.get(
+                (season, year, archer), year_token,
+                lambda: self.store.read(season, [year], archer=archer))
+            for year, year_token in token]
+        if not frames:
+            frames = [self.store.read(season, [], archer=archer)]
+        # Years with different sets of distances don't concatenate as
+        # categories, so the schema is applied again to the combined frame
+        return add_derived_columns(apply_schema(pd.concat(frames, ignore_index=True)))
+
+    # Aggregates of every year, grouped by the store itself if it can
+    def aggregates(self, season, archer=DEFAULT_ARCHER):
+        if hasattr(self.store, "aggregate"):
+            return Aggregates.from_base(self.store.aggregate(season, archer=archer))
+        return Aggregates(self.read(season, archer))
+
+    def stats(self):
+        return {"years": self._years.stats(), "combined": self._combined.stats()}
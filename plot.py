@@ -1,166 +1,119 @@
-from matplotlib import pyplot as plt
-import seaborn as sns
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import os
 
-import pandas as pd
-from datetime import date
+from figures import FIGURES, SAVE_DPI, render
+from history import ScoreHistory
+from store import open_store, DEFAULT_ARCHER
 
-
-YEAR = date.today().strftime("%y")
-score_data = pd.read_csv(f"static/arrow_scores_indoors_{YEAR}.csv", header=0)
-# score_data = pd.read_csv(f"static/arrow_scores_indoors_{YEAR}.csv", header=0)
+# matplotlib and seaborn are slow to import, so figures.py only imports them
+# when figures are actually being plotted
 
 
 #########################
 ## DATA PRE-PROCESSING ##
 #########################
 
-score_data.date = pd.to_datetime(score_data.date)
-score_data["golds_pct"] = (score_data.golds / score_data.arrows)*100
-score_data["days_since_first_entry"] = (
-    score_data.date - min(score_data.date) ).dt.days
-most_recent_date = max(score_data.date).strftime("%Y-%m-%d")
-score_data["day_of_week"] = score_data.date.dt.day_of_week
+def open_history():
+    return ScoreHistory(open_store(os.environ.get("SCORE_STORE", "csv"), "static"))
+
+# Every year of scores for the season, see history.py
+def load_scores(season, archer=DEFAULT_ARCHER, history=None):
+    return (history or open_history()).read(season, archer)
 
 ##############
 ## PLOTTING ##
 ##############
 
-# Figure labels
-plt.xlabel("Distance")
-plt.ylabel("Average Arrow Score")
-
-# Fixes the symptom, not the illness.
-import warnings, matplotlib
-warnings.filterwarnings(
-    "ignore", 
-    category=matplotlib.MatplotlibDeprecationWarning)
-
-# Colour Map used to differentiate days of week or by month
-# DEPRECATION WARNING REGARDING GET_CMAP, TO FIX?
-# Use ``matplotlib.colormaps[name]`` or ``matplotlib.colormaps.get_cmap(obj)`` 
-# instead.
-cmap_seven = plt.cm.get_cmap('cool', 7)
-cmap_twelve = plt.cm.get_cmap('cool', 12)
-
-# cmap_seven = plt.colormaps.get_cmap('cool', 7)
-# cmap_twelve = plt.colormaps.get_cmap('cool', 12)
-# ColormapRegistry.get_cmap() takes 2 positional arguments but 3 were given
-# What's the current equivelant to what I'm trying to do here?
-
-# Scatterplot of distance against arrow average
-# Style: O markers if not competition, X markers if is competition
-# Hue: Change colour of marker depending on day of week of shoot, 
-# uses 'cmap' to discern colours
-
-##############################
-# graphs/day_of_week_fig.png # 
-# graphs/month_fig.png       #
-##############################
-
-def plot_by_hue(hue_type, label, cmap):
-    sns.scatterplot(
-        data = score_data,
-        x = "distance", y = "arrow_average",
-        style = "is_comp",
-        hue = hue_type,
-        palette = cmap,
-    )
-
-    # Plot lines for min / avg / max arrow scores at each distance
-    plt.plot(
-        score_data.distance.unique(), 
-        score_data.groupby(['distance']).arrow_average.max(), 
-        "k:")
-    plt.plot(
-        score_data.distance.unique(), 
-        score_data.groupby(['distance']).arrow_average.mean(), 
-        "g--")
-    plt.plot(
-        score_data.distance.unique(), 
-        score_data.groupby(['distance']).arrow_average.min(), 
-        "k:")
-    
-    plt.show(block=False) # Running in GH codespace, plot does not appear
-    plt.savefig(f"graphs/{label}_fig.png")
-    plt.clf()
-
-plot_by_hue(score_data.day_of_week, "day_of_week", cmap_seven)    
-plot_by_hue(score_data.date.dt.month, "month", cmap_twelve)
-
-###########################
-# graphs/distance_fig.png #
-###########################
-
-cmap = plt.cm.get_cmap('tab10', score_data.distance.nunique())
-sns.scatterplot(
-    data = score_data,
-    x = "date", y = "arrow_average",
-    style = "is_comp",
-    hue = "distance",
-    palette = cmap,
-)
-
-averages = score_data.groupby(['distance']).mean().arrow_average
-for i, avg in enumerate(averages):
-    plt.axhline(avg, color=cmap.colors[i], alpha=0.7, linestyle=':')
-    
-# 252 Scheme Boundaries
-plt.axhline(280 / 36, color='k', linestyle="dashed", linewidth=0.9) # Compound
-plt.axhline(252 / 36, color='k', linestyle="dashed", linewidth=0.9) # Recurve
-
-plt.savefig("graphs/distance_fig.png", dpi=500)
-plt.clf()
-
-#############################
-# graphs/arrows_per_day.png #
-#############################
-
-arrows_per_day = score_data.groupby(score_data.date).arrows.sum()
-plt.plot(arrows_per_day)
-plt.savefig("graphs/arrows_per_day.png")
-
-print(f"Analysis derived from {sum(arrows_per_day)} datapoints.")
+# Draw one figure and save it, run in a worker process by plot_figures()
+def save_figure(name, score_data, aggregates, dpi, directory):
+    path = os.path.join(directory, f"{name}.png")
+    image = render(name, score_data, aggregates, "png", dpi)
+    with open(path, "wb") as file:
+        file.write(image)
+    return path
+
+# Save figures to 'directory', see figures.py for the figures themselves
+# Each figure is drawn on its own Figure, so they can be rendered at the same
+# time in separate processes. 'dpi' overrides SAVE_DPI for every figure.
+def plot_figures(score_data, aggregates, names=None, dpi=None,
+                 directory="graphs", workers=None):
+    names = list(FIGURES) if names is None else names
+    jobs = [
+        (name, score_data, aggregates, dpi or SAVE_DPI.get(name, 100), directory)
+        for name in names]
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+
+    if workers <= 1:
+        paths = [save_figure(*job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(save_figure, *job) for job in jobs]
+            paths = [future.result() for future in futures]
+
+    arrows = aggregates.sum(["is_comp"], ["arrows"]).arrows.sum()
+    print(f"Analysis derived from {arrows} datapoints.")
+    return paths
 
 #####################
 ## DATA DISPLAYING ##
 #####################
 
-# Display the trends depending on day of week
-day_of_week = score_data.groupby(score_data.day_of_week)
-day_of_week_cols = day_of_week[['arrow_average','arrows','golds_pct']]
-day_of_week_summary = day_of_week_cols.mean()
-day_of_week_count = score_data.groupby(score_data.day_of_week)['date'].count()
-day_of_week_merged = day_of_week_summary.merge(day_of_week_count, on=["day_of_week"])
-print(f"\n\nScore Data grouped by Day of Week: \n{day_of_week_merged}\n")
-
-# Display the trends depending on month and year
-month_and_year = score_data.groupby(
-    [score_data.date.dt.year, score_data.date.dt.month])
-month_and_year_cols = month_and_year[['arrow_average','distance','arrows','golds_pct']]
-month_and_year_summary = month_and_year_cols.mean()
-print(f"Score Data grouped by Month: \n{month_and_year_summary}\n")
-
-# Display the trends depending on month and year ALSO seperated by Distance to target
-month_year_dist = score_data.groupby(
-    [score_data.distance, score_data.date.dt.year, score_data.date.dt.month] )
-month_year_dist_cols = month_year_dist[['arrow_average','arrows','golds_pct']]
-month_year_dist_summary = month_year_dist_cols.mean()
-print(f"Score Data grouped by Distance by Month: \n{month_year_dist_summary}\n")
-
-# Display the trends depending on distance
-dist = score_data.groupby(['distance'])
-dist_cols = dist[['arrow_average','arrows','golds_pct']]
-dist_summary = dist_cols.mean()
-print(f"Score Data grouped by Distance: \n{dist_summary}\n")
-
-# Display the trends depending on whether or not the shoot was at a competition
-dist_comp = score_data.groupby([score_data.distance, score_data.is_comp])
-dist_comp_cols = dist_comp[['arrow_average','arrows','golds_pct']]
-dist_comp_summary = dist_comp_cols.mean()
-print(f"Score Data grouped by Competition Status: \n{dist_comp_summary}\n")
-
-comp = score_data.groupby(score_data.is_comp)
-comp_cols = comp[["arrows"]]
-comp_summary = comp_cols.sum()
-comp_summary["dozen"] = comp_summary.arrows / 12
-print(f"Number of arrows grouped by Competition Status: \n{comp_summary}\n")
+# Every table is rolled up from the same Aggregates, see aggregate.py
+def print_summaries(aggregates):
+    columns = ['arrow_average','arrows','golds_pct']
+
+    # Display the trends depending on day of week
+    day_of_week_summary = aggregates.mean(["day_of_week"], columns)
+    day_of_week_summary["count"] = aggregates.count(["day_of_week"])
+    print(f"\n\nScore Data grouped by Day of Week: \n{day_of_week_summary}\n")
+
+    # Display the trends depending on month and year
+    month_and_year_summary = aggregates.mean(
+        ["year", "month"], ['arrow_average','distance','arrows','golds_pct'])
+    print(f"Score Data grouped by Month: \n{month_and_year_summary}\n")
+
+    # Display the trends depending on month and year ALSO seperated by Distance to target
+    month_year_dist_summary = aggregates.mean(["distance", "year", "month"], columns)
+    print(f"Score Data grouped by Distance by Month: \n{month_year_dist_summary}\n")
+
+    # Display the trends depending on distance
+    dist_summary = aggregates.mean(["distance"], columns)
+    print(f"Score Data grouped by Distance: \n{dist_summary}\n")
+
+    # Display the trends depending on whether or not the shoot was at a competition
+    dist_comp_summary = aggregates.mean(["distance", "is_comp"], columns)
+    print(f"Score Data grouped by Competition Status: \n{dist_comp_summary}\n")
+
+    comp_summary = aggregates.sum(["is_comp"], ["arrows"])
+    comp_summary["dozen"] = comp_summary.arrows / 12
+    print(f"Number of arrows grouped by Competition Status: \n{comp_summary}\n")
+
+if __name__ == "__main__":
+    # python plot.py --season indoors
+    # python plot.py --tables-only
+    # python plot.py --figures distance_fig month_fig --dpi 150 --workers 2
+    parser = argparse.ArgumentParser(description="Plot and summarise scores")
+    parser.add_argument("--season", default="indoors", choices=["indoors", "outdoors"])
+    parser.add_argument("--archer", default=DEFAULT_ARCHER)
+    parser.add_argument("--tables-only", action="store_true",
+                        help="print the summary tables without plotting")
+    parser.add_argument("--figures", nargs="+", choices=list(FIGURES),
+                        help="figures to save (default: all of them)")
+    parser.add_argument("--dpi", type=int,
+                        help="resolution for every figure (default: per figure)")
+    parser.add_argument("--workers", type=int,
+                        help="processes to render in (default: one per CPU)")
+    parser.add_argument("--output", default="graphs",
+                        help="directory to save the figures to")
+    args = parser.parse_args()
+
+    # With SCORE_STORE=sqlite the summaries are grouped by the database, and
+    # the scores themselves are only read to plot them
+    history = open_history()
+    aggregates = history.aggregates(args.season, args.archer)
+    if not args.tables_only:
+        score_data = load_scores(args.season, args.archer, history)
+        plot_figures(score_data, aggregates, args.figures, args.dpi,
+                     args.output, args.workers)
+    print_summaries(aggregates)
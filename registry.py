@@ -0,0 +1,103 @@
+import threading
+
+from cache import LRUCache
+from store import DEFAULT_ARCHER
+
+####################
+## MODEL REGISTRY ##
+####################
+
+# Trained models keyed by (season, feature set, archer)
+# Models are only trained (or loaded from a snapshot) the first time they are
+# asked for, and at most 'max_models' are kept in memory at once, however
+# many archers there are. Loads are serialised per key through a fixed set of
+# 'lock_stripes' locks, so the locks don't grow with the number of archers.
+# Each model remembers the change token of the scores it was trained on
+# ('history' is a ScoreHistory, see history.py). If they have since been 
+# written to by another worker, the registry's
+# 'scheduler' (see retrain.py) is told so it can refit the model in the
+# background; the old model keeps serving requests until it is swapped out.
+class ModelRegistry:
+
+    def __init__(self, history, loader, max_models=8, lock_stripes=64):
+        self.history = history
+        # loader(season, features, archer) --> TrainedModel
+        self.loader = loader
+        self.scheduler = None
+        self._models = LRUCache(max_models)
+        self._key_locks = [threading.Lock() for _ in range(lock_stripes)]
+
+    def get(self, season, features, archer=DEFAULT_ARCHER):
+        key = (season, tuple(features), archer)
+        entry = self._models.get(key)
+        if entry is None:
+            return self._load(key)
+        token, trained = entry
+        if self.scheduler and token != self.token(key):
+            self.scheduler.notify(key)
+        return trained
+
+    # The current change token of a model's scores
+    def token(self, key):
+        season, _, archer = key
+        return self.history.token(season, archer)
+
+    # (token, trained) for a loaded model, without counting as a use
+    def peek(self, key):
+        return self._models.peek(key)
+
+    # Replace a loaded model in a single assignment
+    # Requests which already hold the old model carry on using it
+    def swap(self, key, token, trained):
+        with self._key_lock(key):
+            if key in self._models:
+                self._models.put(key, (token, trained))
+
+    # Add a new score to a model which is already loaded
+    # Models which are not loaded will see it when they are first trained
+    # 'before' is the scores' token from before the score was written. Only a
+    # model which was up to date then has the score added and is marked as up
+    # to date now. Any other model is left as it is: one which had already
+    # missed another worker's writes stays stale so that the scheduler refits
+    # it, and one swapped in after the write already has the score.
+    def observe(self, season, row, before, archer=DEFAULT_ARCHER):
+        self._update(season, archer, before, lambda trained: trained.add_score(row))
+
+    # observe() for a frame of new scores, added to each model in one update
+    def observe_many(self, season, score_data, before, archer=DEFAULT_ARCHER):
+        self._update(
+            season, archer, before, lambda trained: trained.add_scores(score_data))
+
+    def _update(self, season, archer, before, add):
+        for key in self.keys():
+            if (key[0], key[2]) != (season, archer):
+                continue
+            with self._key_lock(key):
+                entry = self._models.peek(key)
+                if entry is None or entry[0] != before:
+                    continue
+                add(entry[1])
+                # The model now includes everything written so far
+                self._models.put(key, (self.token(key), entry[1]))
+
+    def keys(self):
+        return self._models.keys()
+
+    def __len__(self):
+        return len(self._models)
+
+    def _key_lock(self, key):
+        return self._key_locks[hash(key) % len(self._key_locks)]
+
+    # Train on first use
+    # Concurrent requests for the same model wait for a single load
+    def _load(self, key):
+        with self._key_lock(key):
+            entry = self._models.get(key)
+            if entry is not None:
+                return entry[1]
+            # Read the token first so a write during training triggers a refit
+            token = self.token(key)
+            trained = self.loader(*key)
+            self._models.put(key, (token, trained))
+            return trained
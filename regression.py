@@ -0,0 +1,214 @@
+import itertools
+import threading
+
+import numpy as np
+
+# Model versions are unique across every model in the process, so a version
+# number alone identifies a set of coefficients
+_versions = itertools.count(1)
+
+###################
+## LINEAR MODELS ##
+###################
+
+# Prediction and scoring shared by the regression backends
+# Subclasses publish (coef_, intercept_, version) as a single '_params' tuple
+class LinearModel:
+
+    @staticmethod
+    def _as_arrays(X, y):
+        X = np.asarray(X, dtype=float)
+        y = np.asarray(y, dtype=float)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if y.ndim == 1:
+            y = y.reshape(X.shape[0], -1)
+        return X, y
+
+    @property
+    def coef_(self):
+        return self._params[0]
+
+    @property
+    def intercept_(self):
+        return self._params[1]
+
+    # Changes every time the coefficients change
+    @property
+    def version(self):
+        return 0 if self._params is None else self._params[2]
+
+    # (coef_, intercept_, version) read together
+    def parameters(self):
+        return self._params
+
+    def predict(self, X):
+        coef, intercept, _ = self._params
+        X = np.asarray(X, dtype=float)
+        return X @ coef.T + intercept
+
+    # Coefficient of determination (R^2), averaged over the targets in the
+    # same way as sklearn's default "uniform_average"
+    # A target with no variance scores 1 if it is predicted exactly and 0
+    # otherwise, as sklearn does, rather than dividing by zero
+    def score(self, X, y):
+        X, y = self._as_arrays(X, y)
+        residual = ((y - self.predict(X)) ** 2).sum(axis=0)
+        total = ((y - y.mean(axis=0)) ** 2).sum(axis=0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            scores = np.where(
+                total > 0, 1 - residual / total, np.where(residual > 0, 0.0, 1.0))
+        return float(np.mean(scores))
+
+##############################
+## INCREMENTAL LINEAR MODEL ##
+##############################
+
+# Ordinary least squares linear regression fitted from running sufficient
+# statistics instead of the raw rows.
+# Only the sums of X, y, X'X and X'y are kept, so adding a new score costs
+# O(features^2) and the coefficients can be re-solved straight away without
+# re-reading the .csv file.
+# The solve is done on the centred statistics so that the intercept is not
+# part of the least squares problem, matching sklearn's LinearRegression.
+class IncrementalRegression(LinearModel):
+
+    backend = "numpy"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset(0, 0)
+
+    def _reset(self, n_features, n_targets):
+        self.n_samples = 0
+        self._sum_x = np.zeros(n_features)
+        self._sum_y = np.zeros(n_targets)
+        self._xtx = np.zeros((n_features, n_features))
+        self._xty = np.zeros((n_features, n_targets))
+        self._params = None
+
+    def fit(self, X, y):
+        X, y = self._as_arrays(X, y)
+        with self._lock:
+            self._reset(X.shape[1], y.shape[1])
+            self._accumulate(X, y)
+        return self
+
+    def partial_fit(self, X, y):
+        X, y = self._as_arrays(X, y)
+        with self._lock:
+            if self._params is None:
+                self._reset(X.shape[1], y.shape[1])
+            self._accumulate(X, y)
+        return self
+
+    def _accumulate(self, X, y):
+        self.n_samples += X.shape[0]
+        self._sum_x += X.sum(axis=0)
+        self._sum_y += y.sum(axis=0)
+        self._xtx += X.T @ X
+        self._xty += X.T @ y
+        self._solve()
+
+    def _solve(self):
+        n = self.n_samples
+        mean_x = self._sum_x / n
+        mean_y = self._sum_y / n
+        # Centred covariance matrices: sum((x - mean_x)(x - mean_x)')
+        s_xx = self._xtx - n * np.outer(mean_x, mean_x)
+        s_xy = self._xty - n * np.outer(mean_x, mean_y)
+        # lstsq gives the minimum norm solution when a feature has no
+        # variance (eg. no competition entries yet)
+        coef = np.linalg.lstsq(s_xx, s_xy, rcond=None)[0]
+        intercept = mean_y - mean_x @ coef
+        # Publish both arrays and the version in a single assignment so a
+        # concurrent predict() never sees a new coef with an old intercept
+        self._params = (coef.T.copy(), intercept, next(_versions))
+
+    # Running statistics as plain arrays, used to save the model to disk
+    def state(self):
+        return {
+            "n_samples": np.array(self.n_samples),
+            "sum_x": self._sum_x,
+            "sum_y": self._sum_y,
+            "xtx": self._xtx,
+            "xty": self._xty,
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        model = cls()
+        model.n_samples = int(state["n_samples"])
+        model._sum_x = np.array(state["sum_x"], dtype=float)
+        model._sum_y = np.array(state["sum_y"], dtype=float)
+        model._xtx = np.array(state["xtx"], dtype=float)
+        model._xty = np.array(state["xty"], dtype=float)
+        model._solve()
+        return model
+
+#######################
+## SKLEARN REGRESSOR ##
+#######################
+
+# sklearn's LinearRegression behind the same surface as IncrementalRegression
+# sklearn can't update a fitted model, so the training rows are kept and the
+# model is refit from all of them on every partial_fit().
+class SklearnRegression(LinearModel):
+
+    backend = "sklearn"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._params = None
+        self._X = None
+        self._y = None
+
+    @property
+    def n_samples(self):
+        return 0 if self._X is None else len(self._X)
+
+    def fit(self, X, y):
+        X, y = self._as_arrays(X, y)
+        with self._lock:
+            self._X, self._y = X, y
+            self._solve()
+        return self
+
+    def partial_fit(self, X, y):
+        X, y = self._as_arrays(X, y)
+        with self._lock:
+            if self._X is not None:
+                X = np.vstack([self._X, X])
+                y = np.vstack([self._y, y])
+            self._X, self._y = X, y
+            self._solve()
+        return self
+
+    def _solve(self):
+        from sklearn import linear_model
+        model = linear_model.LinearRegression().fit(self._X, self._y)
+        self._params = (model.coef_, model.intercept_, next(_versions))
+
+    def state(self):
+        return {"X": self._X, "y": self._y}
+
+    @classmethod
+    def from_state(cls, state):
+        return cls().fit(state["X"], state["y"])
+
+#######################
+## BACKEND SELECTION ##
+#######################
+
+# Regression backends selectable by name, eg. app.config['REGRESSION_BACKEND']
+# "numpy" needs nothing beyond numpy and updates in O(features^2)
+# "sklearn" uses sklearn.linear_model.LinearRegression
+BACKENDS = {
+    model.backend: model for model in [IncrementalRegression, SklearnRegression]
+}
+
+def make_regressor(backend="numpy"):
+    try:
+        return BACKENDS[backend]()
+    except KeyError:
+        raise ValueError(f"Unknown regression backend: {backend}")
@@ -0,0 +1,106 @@
+import os
+import threading
+import time
+
+import numpy as np
+
+#######################
+## RETRAIN SCHEDULER ##
+#######################
+
+# Background thread which keeps the models in a ModelRegistry up to date
+# Every 'interval' seconds (or straight away when the registry notices a
+# stale model) the change token of each loaded model's scores is checked.
+# Once the scores have stopped changing for 'debounce' seconds, or has been
+# changing for 'max_wait' seconds, the model is refit off the request path.
+# The new model is checked against its held-out testing subset and only
+# swapped in if it scores no more than 'tolerance' below the current model.
+class RetrainScheduler:
+
+    def __init__(self, registry, debounce=2.0, interval=5.0,
+                 max_wait=30.0, tolerance=0.1):
+        self.registry = registry
+        self.debounce = debounce
+        self.interval = interval
+        self.max_wait = max_wait
+        self.tolerance = tolerance
+        # key --> (token, first seen, last seen) of a pending change
+        self._pending = {}
+        self._condition = threading.Condition()
+        self._start_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self.swaps = 0
+        self.rejected = 0
+
+    # Called by the registry when it serves a model whose partition changed
+    def notify(self, key):
+        self._ensure_thread()
+        with self._condition:
+            self._condition.notify()
+
+    # Threads do not survive a fork (eg. gunicorn workers), so the
+    # background thread is started on first use in each process
+    def _ensure_thread(self):
+        with self._start_lock:
+            if self._pid != os.getpid() or not self._thread.is_alive():
+                self._pid = os.getpid()
+                self._pending = {}
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait(self.interval)
+            for key in self.poll():
+                try:
+                    self.retrain(key)
+                except Exception as error:
+                    print(f"Retraining {key} failed: {error}")
+
+    # Record changed partitions and return the keys which are due a refit
+    def poll(self, now=None):
+        now = time.monotonic() if now is None else now
+        due = []
+        for key in self.registry.keys():
+            entry = self.registry.peek(key)
+            token = self.registry.token(key)
+            if entry is None or entry[0] == token:
+                self._pending.pop(key, None)
+                continue
+            pending_token, first_seen, last_seen = \
+                self._pending.get(key, (None, now, now))
+            if token != pending_token:
+                last_seen = now
+            self._pending[key] = (token, first_seen, last_seen)
+            if now - last_seen >= self.debounce or now - first_seen >= self.max_wait:
+                due.append(key)
+        return due
+
+    # Refit a model and swap it in if it passes validation
+    def retrain(self, key):
+        self._pending.pop(key, None)
+        entry = self.registry.peek(key)
+        if entry is None:
+            return
+        token = self.registry.token(key)
+        trained = self.registry.loader(*key)
+        if self.validate(entry[1], trained):
+            self.swaps += 1
+            self.registry.swap(key, token, trained)
+        else:
+            # Keep the current model, but don't retry until the next write
+            self.rejected += 1
+            self.registry.swap(key, token, entry[1])
+            print(f"Rejected retrained model for {key}")
+
+    # Score the current and new models on the new held-out testing subset
+    def validate(self, current, trained):
+        if len(trained.y_test) < 2:
+            return True
+        score = trained.model.score(trained.X_test, trained.y_test)
+        if not np.isfinite(score):
+            return False
+        baseline = current.model.score(trained.X_test, trained.y_test)
+        return not np.isfinite(baseline) or score >= baseline - self.tolerance
@@ -1,27 +1,39 @@
-import pandas as pd
-import numpy as np
-from sklearn import linear_model
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-# Read data from csv
-scope = pd.read_csv(f"sight_markings/sight_marks.csv", header = 0)
-distances = scope["distance"]
-sight_markings = scope["sight_marking"]
+import argparse
+import numpy as np
 
-# Reshape into a 'inferred' (-1) by 1 array
-distances = np.reshape(distances, (-1, 1))
-sight_markings = np.reshape(sight_markings, (-1, 1))
+from regression import BACKENDS, make_regressor
 
-# Create and fit the model
-# Predict values to plot, and user specified distance
-model = linear_model.LinearRegression()
-model.fit(distances, sight_markings)
+# pandas is slow to import, so it is only imported once the sight marks are
+# actually being fitted
 
 distances_yds = [10,     20, 30, 40, 50, 60, 70, 80, 90, 100, ]
 distances_m =   [10, 18, 20, 30, 40, 50, 60, 70, 80, 90, 100, ]
 
-def predicter(distances_arr, unit):
+def fit_model(backend="numpy"):
+    import pandas as pd
+
+    # Read data from csv
+    scope = pd.read_csv(f"sight_markings/sight_marks.csv", header = 0)
+    distances = scope["distance"]
+    sight_markings = scope["sight_marking"]
+
+    # Reshape into a 'inferred' (-1) by 1 array
+    distances = np.reshape(distances, (-1, 1))
+    sight_markings = np.reshape(sight_markings, (-1, 1))
+
+    # Create and fit the model
+    # Predict values to plot, and user specified distance
+    model = make_regressor(backend)
+    model.fit(distances, sight_markings)
+    return model
+
+def predicter(model, distances_arr, unit):
     for distance in distances_arr:
-        
+
         # Lin-reg model uses yard values as input
         # If metres are being predicted, convert to yards BUT keep the front-facing
         # value (distance) as metres to display later.
@@ -29,11 +41,19 @@ def predicter(distances_arr, unit):
             distance_modified = distance * 1.09361
         else:
             distance_modified = distance
-            
+
         distance_modified = np.reshape(distance_modified, (-1, 1))
         sight_mark = model.predict(distance_modified)
         print(f"{distance}{unit} : {sight_mark[0][0]:.2f}")
     print()
-        
-predicter(distances_yds, "yds")
-predicter(distances_m, "m")
\ No newline at end of file
+
+if __name__ == "__main__":
+    # python sight_markings/sight_markings.py
+    # python sight_markings/sight_markings.py --backend sklearn
+    parser = argparse.ArgumentParser(description="Predict sight marks")
+    parser.add_argument("--backend", default="numpy", choices=sorted(BACKENDS))
+    args = parser.parse_args()
+
+    model = fit_model(args.backend)
+    predicter(model, distances_yds, "yds")
+    predicter(model, distances_m, "m")
@@ -0,0 +1,62 @@
+import glob
+import hashlib
+import os
+
+import numpy as np
+
+# Bump when the layout of the saved arrays changes so old snapshots are
+# ignored rather than misread
+FORMAT_VERSION = 3
+
+#####################
+## MODEL SNAPSHOTS ##
+#####################
+
+# Trained models are saved to disk as .npz files named after a hash of the
+# data they were trained on. A worker starting up with unchanged data loads
+# the saved arrays instead of parsing the scores and refitting.
+# models/{name}-v{FORMAT_VERSION}-{key}.npz
+
+# Hash of the training data (the store's digest) and anything else which
+# affects the fitted model, eg. the train/test split parameters
+def snapshot_key(*parts):
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(repr(part).encode())
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+def snapshot_path(directory, name, key):
+    return os.path.join(directory, f"{name}-v{FORMAT_VERSION}-{key}.npz")
+
+def save_snapshot(path, arrays):
+    # Write to a temporary name then rename so other workers never load a
+    # half-written file
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as file:
+        np.savez(file, **arrays)
+    os.replace(temp_path, path)
+
+def load_snapshot(path):
+    with np.load(path, allow_pickle=False) as data:
+        return {name: data[name] for name in data.files}
+
+# Load the snapshot for 'key', or call 'build()' to create the arrays and
+# save them, removing any older snapshots of the same name
+def load_or_build(directory, name, key, build):
+    path = snapshot_path(directory, name, key)
+    try:
+        return load_snapshot(path)
+    except (OSError, ValueError):
+        pass
+
+    arrays = build()
+    os.makedirs(directory, exist_ok=True)
+    save_snapshot(path, arrays)
+    for old_path in glob.glob(snapshot_path(directory, name, "*")):
+        if old_path != path:
+            try:
+                os.remove(old_path)
+            except FileNotFoundError:
+                pass
+    return arrays
@@ -0,0 +1,578 @@
+import fcntl
+import glob
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+# pandas and pyarrow are slow to import, so they are only imported by the
+# functions which need them. pyarrow is only needed for the Parquet backend.
+pa = pq = None
+
+def import_pyarrow():
+    global pa, pq
+    if pa is None:
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise RuntimeError("The parquet score store requires pyarrow")
+        pa, pq = pyarrow, pyarrow.parquet
+
+# Columns of a score row, in the order they are written to the .csv files
+COLUMNS = ["arrow_average", "distance", "date", "golds", "arrows", "is_comp"]
+
+# Compact in-memory types of the score columns, used for every frame read
+# from a store. There are only a handful of distances, so they are stored as
+# categories. 'date' is parsed to datetime64 as the file is read.
+DTYPES = {
+    "arrow_average": "float32",
+    "distance": "category",
+    "golds": "int16",
+    "arrows": "int16",
+    "is_comp": "int8",
+}
+
+# Orders the results table can be sorted in, as (columns, ascending)
+# The SQLite store keeps an index for each of them, see read_sorted()
+SORTS = {
+    "distance": (["distance", "arrow_average"], [True, False]),
+    "arrow_average": (["arrow_average"], [False]),
+    "golds": (["golds"], [False]),
+    "arrows": (["arrows"], [False]),
+    "date": (["date"], [False]),
+}
+
+# Cast the score columns of a frame to DTYPES
+# Distances are parsed as floats first so the categories are numbers
+def apply_schema(frame):
+    import pandas as pd
+    for column, dtype in DTYPES.items():
+        if column not in frame or frame[column].dtype == dtype:
+            continue
+        if dtype == "category":
+            frame[column] = frame[column].astype("float64").astype("category")
+        else:
+            frame[column] = frame[column].astype(dtype)
+    if "date" in frame and frame["date"].dtype.kind != "M":
+        frame["date"] = pd.to_datetime(frame["date"])
+    return frame
+
+# Lock file shared by every process writing to the stores under a root
+LOCK_NAME = ".scores.lock"
+
+# Scores are partitioned by archer as well as by season and year
+# The default archer's partitions are the original files under the root;
+# every other archer has their own directory of partitions.
+# Archer names are used in paths, so they are limited to a safe alphabet.
+DEFAULT_ARCHER = "default"
+ARCHER_PATTERN = re.compile(r"[a-z0-9-]{1,32}")
+
+def check_archer(archer):
+    if not ARCHER_PATTERN.fullmatch(archer):
+        raise ValueError(f"Invalid archer name: {archer!r}")
+    return archer
+
+# Build the store selected by 'backend' ("csv", "parquet" or "sqlite")
+# 'root' is the directory holding the existing .csv files
+def open_store(backend, root="static"):
+    if backend == "csv":
+        return CsvScoreStore(root)
+    if backend == "parquet":
+        store = ParquetScoreStore(os.path.join(root, "scores"))
+    elif backend == "sqlite":
+        store = SqliteScoreStore(os.path.join(root, "scores.db"))
+    else:
+        raise ValueError(f"Unknown score store backend: {backend}")
+    # Copy across any .csv partitions which have not been imported yet
+    # Locked so that workers starting together only import them once
+    with store_lock(os.path.join(root, LOCK_NAME)):
+        store.import_csv(CsvScoreStore(root))
+    return store
+
+# Turn a list of score dicts into a frame with the 'date' column parsed
+def rows_to_frame(rows):
+    import pandas as pd
+    return apply_schema(pd.DataFrame(list(rows), columns=COLUMNS))
+
+# Exclusive inter-process lock held while writing to a store
+@contextmanager
+def store_lock(path):
+    with open(path, "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+# Hash of the raw bytes of a list of files, used to key model snapshots
+def digest_files(paths):
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as file:
+            for block in iter(lambda: file.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+# Flush a file or directory to disk
+def fsync_path(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+###############
+## CSV STORE ##
+###############
+
+# One text file per archer, season and year
+# static/arrow_scores_{season}_{yy}.csv for the default archer
+# static/archers/{archer}/arrow_scores_{season}_{yy}.csv for everyone else
+class CsvScoreStore:
+
+    pattern = re.compile(r"arrow_scores_(?P<season>\w+?)_(?P<year>\d{2})\.csv$")
+
+    def __init__(self, root):
+        self.root = root
+        self.lock_path = os.path.join(root, LOCK_NAME)
+
+    def lock(self):
+        return store_lock(self.lock_path)
+
+    def archer_root(self, archer=DEFAULT_ARCHER):
+        if check_archer(archer) == DEFAULT_ARCHER:
+            return self.root
+        return os.path.join(self.root, "archers", archer)
+
+    # Every archer with a directory of scores, plus the default archer
+    def archers(self):
+        found = glob.glob(os.path.join(self.root, "archers", "*", ""))
+        return sorted({DEFAULT_ARCHER} | {
+            os.path.basename(os.path.dirname(path)) for path in found})
+
+    def path(self, season, year, archer=DEFAULT_ARCHER):
+        return os.path.join(
+            self.archer_root(archer), f"arrow_scores_{season}_{year}.csv")
+
+    # Sorted list of (season, year) tuples which have a file on disk
+    def partitions(self, season=None, archer=DEFAULT_ARCHER):
+        found = []
+        pattern = os.path.join(self.archer_root(archer), "arrow_scores_*.csv")
+        for path in glob.glob(pattern):
+            match = self.pattern.search(os.path.basename(path))
+            if match and season in (None, match["season"]):
+                found.append((match["season"], match["year"]))
+        return sorted(found)
+
+    # Changes whenever the partition is written to, None if it does not exist
+    def token(self, season, year, archer=DEFAULT_ARCHER):
+        try:
+            stat = os.stat(self.path(season, year, archer))
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def digest(self, season, years, archer=DEFAULT_ARCHER):
+        return digest_files([
+            self.path(season, year, archer) for year in years
+            if os.path.exists(self.path(season, year, archer))])
+
+    # Options for read_csv() of 'columns'
+    # Types are given up front rather than inferred from the text, with
+    # distance read as a float and made categorical once combined
+    def _read_options(self, columns):
+        dtypes = {
+            column: "float64" if dtype == "category" else dtype
+            for column, dtype in DTYPES.items() if column in columns}
+        return dict(header=0, usecols=columns, dtype=dtypes,
+                    parse_dates=["date"] if "date" in columns else False)
+
+    def _years(self, season, years, archer):
+        if years is None:
+            years = [year for _, year in self.partitions(season, archer)]
+        return [year for year in years if os.path.exists(self.path(season, year, archer))]
+
+    # Partitions which don't exist are read as having no scores
+    def read(self, season, years=None, columns=None, archer=DEFAULT_ARCHER):
+        import pandas as pd
+        columns = columns or COLUMNS
+        frames = [
+            pd.read_csv(self.path(season, year, archer), **self._read_options(columns))
+            for year in self._years(season, years, archer)]
+        frame = pd.concat(frames, ignore_index=True) if frames else \
+            pd.DataFrame(columns=columns)
+        return apply_schema(frame)
+
+    # read() as frames of at most 'chunk_rows' rows, one partition at a time
+    def read_chunks(self, season, years=None, columns=None, archer=DEFAULT_ARCHER,
+                    chunk_rows=10000):
+        import pandas as pd
+        columns = columns or COLUMNS
+        for year in self._years(season, years, archer):
+            with pd.read_csv(self.path(season, year, archer), chunksize=chunk_rows,
+                             **self._read_options(columns)) as chunks:
+                for chunk in chunks:
+                    yield apply_schema(chunk)
+
+    def append(self, season, year, rows, archer=DEFAULT_ARCHER):
+        path = self.path(season, year, archer)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # New files need a header; existing files have no trailing newline
+        to_write = "" if os.path.exists(path) else ",".join(COLUMNS)
+        for row in rows:
+            to_write += (
+                f'\n{row["arrow_average"]:.2f},{row["distance"]:.2f},'
+                f'"{row["date"]}",{row["golds"]},{row["arrows"]},{row["is_comp"]}')
+        # One write() of the whole batch followed by a single fsync
+        with open(path, "a+") as file:
+            file.write(to_write)
+            file.flush()
+            os.fsync(file.fileno())
+
+###################
+## PARQUET STORE ##
+###################
+
+# Typed columnar files partitioned by archer, season and year
+# static/scores/season={season}/year={yy}/part-*.parquet for the default archer
+# static/scores/archer={archer}/season={season}/year={yy}/part-*.parquet
+# Every append adds a new part file, so writes never rewrite old data. Once a
+# partition has more than 'max_parts' files they are compacted into one.
+class ParquetScoreStore:
+
+    max_parts = 16
+
+    def __init__(self, root):
+        import_pyarrow()
+        self.schema = pa.schema([
+            ("arrow_average", pa.float64()),
+            ("distance", pa.float64()),
+            ("date", pa.timestamp("ns")),
+            ("golds", pa.int64()),
+            ("arrows", pa.int64()),
+            ("is_comp", pa.int64()),
+        ])
+        self.root = root
+        # Shares the lock of the .csv files it was imported from
+        self.lock_path = os.path.join(os.path.dirname(root), LOCK_NAME)
+
+    def lock(self):
+        return store_lock(self.lock_path)
+
+    def archer_root(self, archer=DEFAULT_ARCHER):
+        if check_archer(archer) == DEFAULT_ARCHER:
+            return self.root
+        return os.path.join(self.root, f"archer={archer}")
+
+    def archers(self):
+        found = glob.glob(os.path.join(self.root, "archer=*"))
+        return sorted({DEFAULT_ARCHER} | {
+            os.path.basename(path)[len("archer="):] for path in found})
+
+    def path(self, season, year, archer=DEFAULT_ARCHER):
+        return os.path.join(
+            self.archer_root(archer), f"season={season}", f"year={year}")
+
+    def _parts(self, season, year, archer=DEFAULT_ARCHER):
+        return sorted(glob.glob(
+            os.path.join(self.path(season, year, archer), "*.parquet")))
+
+    def partitions(self, season=None, archer=DEFAULT_ARCHER):
+        found = []
+        pattern = os.path.join(self.archer_root(archer), "season=*", "year=*")
+        for path in glob.glob(pattern):
+            part_season = os.path.basename(os.path.dirname(path))[len("season="):]
+            year = os.path.basename(path)[len("year="):]
+            if season in (None, part_season) and \
+                    self._parts(part_season, year, archer):
+                found.append((part_season, year))
+        return sorted(found)
+
+    def token(self, season, year, archer=DEFAULT_ARCHER):
+        stats = [os.stat(part) for part in self._parts(season, year, archer)]
+        if not stats:
+            return None
+        return (len(stats), max(stat.st_mtime_ns for stat in stats),
+                sum(stat.st_size for stat in stats))
+
+    def digest(self, season, years, archer=DEFAULT_ARCHER):
+        return digest_files([
+            part for year in years for part in self._parts(season, year, archer)])
+
+    def read(self, season, years=None, columns=None, archer=DEFAULT_ARCHER):
+        if years is None:
+            years = [year for _, year in self.partitions(season, archer)]
+        tables = [
+            pq.read_table(part, columns=columns, schema=self.schema)
+            for year in years for part in self._parts(season, year, archer)]
+        if not tables:
+            return apply_schema(self.schema.empty_table().to_pandas()[columns or COLUMNS])
+        return apply_schema(pa.concat_tables(tables).to_pandas())
+
+    def read_chunks(self, season, years=None, columns=None, archer=DEFAULT_ARCHER,
+                    chunk_rows=10000):
+        if years is None:
+            years = [year for _, year in self.partitions(season, archer)]
+        for year in years:
+            for part in self._parts(season, year, archer):
+                batches = pq.ParquetFile(part).iter_batches(
+                    batch_size=chunk_rows, columns=columns or COLUMNS)
+                for batch in batches:
+                    yield apply_schema(batch.to_pandas())
+
+    def append(self, season, year, rows, archer=DEFAULT_ARCHER):
+        frame = rows if hasattr(rows, "columns") else rows_to_frame(rows)
+        self._write_part(season, year, frame, archer)
+        if len(self._parts(season, year, archer)) > self.max_parts:
+            self.compact(season, year, archer)
+
+    # Write to a temporary name then rename so readers never see half a file
+    def _write_part(self, season, year, frame, archer=DEFAULT_ARCHER):
+        directory = self.path(season, year, archer)
+        os.makedirs(directory, exist_ok=True)
+        name = f"part-{time.time_ns()}-{uuid.uuid4().hex[:8]}.parquet"
+        # Files keep the wider types; categories are stored as plain floats
+        table = pa.Table.from_pandas(
+            frame[COLUMNS].astype({"distance": "float64"}),
+            schema=self.schema, preserve_index=False)
+        temp_path = os.path.join(directory, f".{name}.tmp")
+        pq.write_table(table, temp_path)
+        fsync_path(temp_path)
+        os.replace(temp_path, os.path.join(directory, name))
+        fsync_path(directory)
+
+    # Merge all part files of a partition into a single file
+    def compact(self, season, year, archer=DEFAULT_ARCHER):
+        parts = self._parts(season, year, archer)
+        if len(parts) < 2:
+            return
+        self._write_part(
+            season, year, self.read(season, [year], archer=archer), archer)
+        for part in parts:
+            os.remove(part)
+
+    # Import .csv partitions which do not exist in this store yet
+    def import_csv(self, csv_store):
+        for archer in csv_store.archers():
+            existing = set(self.partitions(archer=archer))
+            for season, year in csv_store.partitions(archer=archer):
+                if (season, year) not in existing:
+                    self._write_part(
+                        season, year,
+                        csv_store.read(season, [year], archer=archer), archer)
+
+##################
+## SQLITE STORE ##
+##################
+
+# Every score in one SQLite database, static/scores.db
+# Scores are indexed by (archer, season, year, distance, date) so reads of a
+# partition don't scan the table. results() pages and the plot.py summaries
+# are sorted and grouped by SQLite (see read_sorted() and aggregate()) instead
+# of pandas.
+# The database is in WAL mode, so readers never wait for a writer. Each
+# thread keeps one connection open and reuses it for every query.
+# Each partition has a version number which is incremented in the same
+# transaction as an append, and is used as its change token.
+class SqliteScoreStore:
+
+    def __init__(self, path):
+        self.path = path
+        self.lock_path = os.path.join(os.path.dirname(path), LOCK_NAME)
+        self._local = threading.local()
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript("""
+                CREATE TABLE IF NOT EXISTS scores (
+                    archer TEXT NOT NULL,
+                    season TEXT NOT NULL,
+                    year TEXT NOT NULL,
+                    arrow_average REAL NOT NULL,
+                    distance REAL NOT NULL,
+                    date TEXT NOT NULL,
+                    golds INTEGER NOT NULL,
+                    arrows INTEGER NOT NULL,
+                    is_comp INTEGER NOT NULL);
+                CREATE INDEX IF NOT EXISTS scores_partition
+                    ON scores (archer, season, year, distance, date);
+                CREATE TABLE IF NOT EXISTS partitions (
+                    archer TEXT NOT NULL,
+                    season TEXT NOT NULL,
+                    year TEXT NOT NULL,
+                    version INTEGER NOT NULL,
+                    PRIMARY KEY (archer, season, year));
+                CREATE TABLE IF NOT EXISTS meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL);
+            """)
+            # One index per order in SORTS, in the same directions, so that
+            # read_sorted() walks an index rather than sorting the scores
+            for name, (by, ascending) in SORTS.items():
+                db.execute(
+                    f"CREATE INDEX IF NOT EXISTS scores_by_{name} "
+                    f"ON scores (archer, season, {self._order(by, ascending)})")
+            # Identifies this database in digests, so partition versions of a
+            # recreated database never match snapshots from the old one
+            db.execute(
+                "INSERT OR IGNORE INTO meta VALUES ('id', ?)", (uuid.uuid4().hex,))
+            self.id = db.execute("SELECT value FROM meta WHERE key = 'id'").fetchone()[0]
+
+    # This thread's connection, opened on first use
+    # Connections are not shared after a fork (eg. gunicorn workers)
+    def _connect(self):
+        local = self._local
+        if getattr(local, "pid", None) != os.getpid():
+            local.db = sqlite3.connect(self.path, timeout=30)
+            local.db.execute("PRAGMA synchronous=NORMAL")
+            local.pid = os.getpid()
+        return local.db
+
+    def lock(self):
+        return store_lock(self.lock_path)
+
+    def archers(self):
+        found = self._connect().execute(
+            "SELECT DISTINCT archer FROM partitions").fetchall()
+        return sorted({DEFAULT_ARCHER} | {archer for archer, in found})
+
+    def partitions(self, season=None, archer=DEFAULT_ARCHER):
+        found = self._connect().execute(
+            "SELECT season, year FROM partitions WHERE archer = ? "
+            "AND (? IS NULL OR season = ?)",
+            (check_archer(archer), season, season)).fetchall()
+        return sorted(found)
+
+    def token(self, season, year, archer=DEFAULT_ARCHER):
+        found = self._connect().execute(
+            "SELECT version FROM partitions WHERE archer = ? AND season = ? "
+            "AND year = ?", (check_archer(archer), season, year)).fetchone()
+        return None if found is None else found[0]
+
+    def digest(self, season, years, archer=DEFAULT_ARCHER):
+        digest = hashlib.sha256(self.id.encode())
+        for year in years:
+            digest.update(f"{year}:{self.token(season, year, archer)};".encode())
+        return digest.hexdigest()
+
+    # Filters on the indexed columns, with 'years' None for every year
+    def _where(self, season, years, archer):
+        where = "archer = ? AND season = ?"
+        params = [check_archer(archer), season]
+        if years is not None:
+            where += f" AND year IN ({', '.join('?' * len(years))})"
+            params += list(years)
+        return where, params
+
+    def _query(self, sql, params):
+        import pandas as pd
+        return pd.read_sql_query(sql, self._connect(), params=params)
+
+    def read(self, season, years=None, columns=None, archer=DEFAULT_ARCHER):
+        columns = columns or COLUMNS
+        where, params = self._where(season, years, archer)
+        return apply_schema(self._query(
+            f"SELECT {', '.join(columns)} FROM scores WHERE {where} ORDER BY rowid",
+            params))
+
+    # read() fetched from a cursor 'chunk_rows' at a time
+    def read_chunks(self, season, years=None, columns=None, archer=DEFAULT_ARCHER,
+                    chunk_rows=10000):
+        import pandas as pd
+        columns = columns or COLUMNS
+        where, params = self._where(season, years, archer)
+        chunks = pd.read_sql_query(
+            f"SELECT {', '.join(columns)} FROM scores WHERE {where} ORDER BY rowid",
+            self._connect(), params=params, chunksize=chunk_rows)
+        for chunk in chunks:
+            yield apply_schema(chunk)
+
+    @staticmethod
+    def _order(by, ascending):
+        return ", ".join(
+            f"{column} {'ASC' if up else 'DESC'}" for column, up in zip(by, ascending))
+
+    # Every year of scores in the order SORTS[sort], ties in the order they
+    # were added
+    def _sorted_query(self, season, sort, columns, archer):
+        by, ascending = SORTS[sort]
+        where, params = self._where(season, None, archer)
+        return (
+            f"SELECT {', '.join(columns or COLUMNS)} FROM scores WHERE {where} "
+            f"ORDER BY {self._order(by, ascending)}, rowid", params)
+
+    # 'limit' scores from 'offset' onwards of every year, in SORTS[sort] order
+    def read_sorted(self, season, sort, offset=0, limit=-1, columns=None,
+                    archer=DEFAULT_ARCHER):
+        sql, params = self._sorted_query(season, sort, columns, archer)
+        return apply_schema(self._query(f"{sql} LIMIT ? OFFSET ?", params + [limit, offset]))
+
+    # read_sorted() of every score, fetched from a cursor 'chunk_rows' at a time
+    def read_sorted_chunks(self, season, sort, columns=None, archer=DEFAULT_ARCHER,
+                           chunk_rows=10000):
+        import pandas as pd
+        sql, params = self._sorted_query(season, sort, columns, archer)
+        for chunk in pd.read_sql_query(
+                sql, self._connect(), params=params, chunksize=chunk_rows):
+            yield apply_schema(chunk)
+
+    # Number of scores in every year of a season
+    def count(self, season, archer=DEFAULT_ARCHER):
+        where, params = self._where(season, None, archer)
+        return self._connect().execute(
+            f"SELECT COUNT(*) FROM scores WHERE {where}", params).fetchone()[0]
+
+    # The grouped partial results of aggregate.Aggregates, computed by SQLite
+    # See Aggregates.from_base()
+    def aggregate(self, season, years=None, archer=DEFAULT_ARCHER):
+        from aggregate import STATS, VALUES
+        where, params = self._where(season, years, archer)
+        expressions = {
+            "arrow_average": "arrow_average",
+            "distance": "distance",
+            "arrows": "arrows",
+            "golds_pct": "golds * 100.0 / arrows",
+        }
+        selects = ["COUNT(*) AS rows"] + [
+            f"{stat.upper()}({expressions[column]}) AS {column}_{stat}"
+            for column in VALUES for stat in STATS]
+        return self._query(
+            f"SELECT date, distance, is_comp, {', '.join(selects)} FROM scores "
+            f"WHERE {where} GROUP BY date, distance, is_comp", params)
+
+    # All of 'rows' and the partition's new version in one transaction
+    def append(self, season, year, rows, archer=DEFAULT_ARCHER):
+        self.append_many(season, {year: rows}, archer)
+
+    # Rows for several years of a season, {year: rows}, in one transaction
+    def append_many(self, season, years, archer=DEFAULT_ARCHER):
+        check_archer(archer)
+        with self._connect() as db:
+            for year, rows in years.items():
+                frame = rows if hasattr(rows, "columns") else rows_to_frame(rows)
+                frame = frame[COLUMNS].astype({"distance": "float64"})
+                records = zip(
+                    frame.arrow_average.astype(float).round(2), frame.distance.round(2),
+                    frame.date.dt.strftime("%Y-%m-%d"), frame.golds.astype(int),
+                    frame.arrows.astype(int), frame.is_comp.astype(int))
+                db.executemany(
+                    "INSERT INTO scores VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(archer, season, year, *record) for record in records])
+                db.execute(
+                    "INSERT INTO partitions VALUES (?, ?, ?, 1) ON CONFLICT "
+                    "(archer, season, year) DO UPDATE SET version = version + 1",
+                    (archer, season, year))
+
+    # Import .csv partitions which do not exist in this store yet
+    def import_csv(self, csv_store):
+        for archer in csv_store.archers():
+            existing = set(self.partitions(archer=archer))
+            for season, year in csv_store.partitions(archer=archer):
+                if (season, year) not in existing:
+                    self.append(
+                        season, year,
+                        csv_store.read(season, [year], archer=archer), archer)
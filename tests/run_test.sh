@@ -1,5 +1,5 @@
 #!/bin/bash
 
 source bin/activate
-python3 -m pytest -v --no-header tests/test_forms.py | tee tests/results.txt
+python3 -m pytest -v --no-header tests/ | tee tests/results.txt
 deactivate
\ No newline at end of file
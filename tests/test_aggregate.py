@@ -0,0 +1,70 @@
+# USAGE
+# pytest -v --no-header tests/test_aggregate.py
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from aggregate import Aggregates, Rollups
+from store import CsvScoreStore
+from training import add_derived_columns
+
+# ---
+
+SCORES = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static")
+COLUMNS = ["arrow_average", "arrows", "golds_pct"]
+
+def make_scores():
+    return add_derived_columns(CsvScoreStore(SCORES).read("outdoors", ["23"]))
+
+def test_rollups_match_groupby():
+    score_data = make_scores()
+    aggregates = Aggregates(score_data)
+
+    expected = score_data.groupby(["distance", "is_comp"])[COLUMNS].mean()
+    assert np.allclose(aggregates.mean(["distance", "is_comp"], COLUMNS), expected)
+
+    expected = score_data.groupby([score_data.date.dt.year, score_data.date.dt.month])
+    assert np.allclose(aggregates.mean(["year", "month"], COLUMNS), expected[COLUMNS].mean())
+
+    by_distance = score_data.groupby("distance").arrow_average
+    assert np.allclose(aggregates.max(["distance"], ["arrow_average"]).arrow_average,
+                       by_distance.max())
+    assert np.allclose(aggregates.min(["distance"], ["arrow_average"]).arrow_average,
+                       by_distance.min())
+    assert (aggregates.count(["day_of_week"]).to_numpy()
+            == score_data.groupby("day_of_week").size().to_numpy()).all()
+    assert aggregates.sum(["is_comp"], ["arrows"]).arrows.sum() == score_data.arrows.sum()
+
+def test_rollup_is_reused():
+    aggregates = Aggregates(make_scores())
+    assert aggregates.rollup(["distance"]) is aggregates.rollup(["distance"])
+
+def test_Rollups_add_matches_rebuild():
+    score_data = make_scores()
+    rollups = Rollups.from_frame(score_data.iloc[:-3])
+    for _, row in score_data.iloc[-3:].iterrows():
+        rollups.add(row.to_dict())
+    rebuilt = Rollups.from_frame(score_data)
+    for period in ["day", "month"]:
+        for added, expected in zip(rollups.summary(period), rebuilt.summary(period)):
+            assert added.keys() == expected.keys()
+            for key, value in expected.items():
+                if isinstance(value, float):
+                    assert np.isclose(added[key], value)
+                else:
+                    assert added[key] == value
+
+def test_Rollups_match_groupby():
+    score_data = make_scores()
+    summary = Rollups.from_frame(score_data).summary("month")
+    months = score_data.date.dt.strftime("%Y-%m")
+    expected = score_data.groupby(
+        [score_data.distance.astype(float), months]).arrow_average.agg(["mean", "var"])
+    assert np.allclose([row["arrow_average_mean"] for row in summary], expected["mean"])
+    variances = [row["arrow_average_var"] for row in summary]
+    assert np.allclose([np.nan if var is None else var for var in variances],
+                       expected["var"], equal_nan=True)
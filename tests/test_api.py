@@ -0,0 +1,247 @@
+# USAGE
+# pytest -v --no-header tests/test_api.py
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datetime import date
+
+import json
+import re
+import shutil
+
+import numpy as np
+
+from app import app, models, predict_one, figure_cache, history, store, writer
+from forms import distances
+from store import COLUMNS, CsvScoreStore
+from training import FEATURES
+
+# ---
+
+def test_api_predict_season_plan():
+    with app.test_client() as client:
+        response = client.post("/api/predict", json={
+            "distances": distances,
+            "dates": [date.today().isoformat()],
+            "is_comp": 1,
+        })
+        assert response.status_code == 200
+        data = response.get_json()
+        assert len(data["avg_score"]) == len(distances)
+        assert len(data["gold_pct"]) == len(distances)
+        assert all(0 <= pct <= 100 for pct in data["gold_pct"])
+
+        # Matches a single prediction made the same way as index()
+        trained = models.get("outdoors", FEATURES)
+        expected = trained.model.predict([[distances[3], trained.latest_day, 1]])
+        assert np.isclose(data["avg_score"][3], min(expected[0][0], 10))
+
+def test_api_predict_metres():
+    with app.test_client() as client:
+        response = client.post("/api/predict", json={
+            "distances": [70],
+            "dates": date.today().isoformat(),
+            "units": 1.09361,
+        })
+        assert np.isclose(response.get_json()["distances"][0], 70 * 1.09361)
+
+def test_api_predict_indoors():
+    with app.test_client() as client:
+        response = client.post("/api/predict", json={
+            "season": "indoors",
+            "distances": [20],
+            "dates": date.today().isoformat(),
+        })
+        assert response.status_code == 200
+        assert ("indoors", tuple(FEATURES), "default") in models.keys()
+
+def test_api_predict_bad_request():
+    with app.test_client() as client:
+        response = client.post("/api/predict", json={"distances": [20]})
+        assert response.status_code == 400
+        response = client.post("/api/predict", json={
+            "season": "winter",
+            "distances": [20],
+            "dates": "2023-10-01",
+        })
+        assert response.status_code == 400
+        response = client.post("/api/predict", json={
+            "distances": [20, 30, 40],
+            "dates": ["2023-10-01", "2023-10-02"],
+        })
+        assert response.status_code == 400
+        for body in [[1, 2], {"season": ["outdoors"]},
+                     {"distances": [None], "dates": "2023-10-01"},
+                     {"distances": [20], "dates": [None]},
+                     {"distances": [20], "dates": "2023-10-01", "units": "inf"},
+                     {"distances": {"a": 1}, "dates": "2023-10-01"}]:
+            response = client.post("/api/predict", json=body)
+            assert response.status_code == 400
+            assert "error" in response.get_json()
+
+def test_api_predict_row_limit(monkeypatch):
+    monkeypatch.setitem(app.config, "MAX_PREDICT_ROWS", 100)
+    with app.test_client() as client:
+        # A column of distances against a row of dates would be a 2000x2000 grid
+        response = client.post("/api/predict", json={
+            "distances": [[20]] * 2000,
+            "dates": ["2023-10-01"] * 2000,
+        })
+        assert response.status_code == 400
+        response = client.post("/api/predict", json={
+            "distances": [20] * 101,
+            "dates": "2023-10-01",
+        })
+        assert response.status_code == 400
+        assert "100" in response.get_json()["error"]
+        response = client.post("/api/predict", json={
+            "distances": [20] * 100,
+            "dates": "2023-10-01",
+        })
+        assert response.status_code == 200
+
+def test_api_stats_prediction_cache():
+    with app.test_client() as client:
+        stats = client.get("/api/stats").get_json()["prediction_cache"]
+        trained = models.get("outdoors", FEATURES)
+        first = predict_one(trained, 50.0, trained.latest_day, False)
+        second = predict_one(trained, 50.0, trained.latest_day, False)
+        assert np.allclose(first, second)
+
+        after = client.get("/api/stats").get_json()["prediction_cache"]
+        assert after["misses"] == stats["misses"] + 1
+        assert after["hits"] == stats["hits"] + 1
+
+def test_figure_route_is_cached():
+    with app.test_client() as client:
+        response = client.get("/figures/outdoors/distance_fig.svg?dpi=72")
+        assert response.status_code == 200
+        assert response.mimetype == "image/svg+xml"
+        hits = figure_cache.hits
+        again = client.get("/figures/outdoors/distance_fig.svg?dpi=72")
+        assert again.data == response.data
+        assert figure_cache.hits == hits + 1
+
+        unchanged = client.get("/figures/outdoors/distance_fig.svg?dpi=72",
+                               headers={"If-None-Match": response.headers["ETag"]})
+        assert unchanged.status_code == 304
+
+        assert client.get("/figures/outdoors/nonsense.png").status_code == 404
+
+def test_unknown_archer():
+    with app.test_client() as client:
+        response = client.post("/api/predict", json={
+            "archer": "nobody", "distances": [20], "dates": date.today().isoformat()})
+        assert response.status_code == 404
+        assert client.get("/figures/outdoors/month_fig.png?archer=nobody").status_code == 404
+        response = client.get("/results/outdoors/nobody")
+        assert response.status_code == 200
+        assert 'href="/static/style.css"' in response.data.decode()
+        assert client.get("/results/outdoors/No%20Body").status_code == 404
+
+def test_results_pages():
+    total = len(history.read("outdoors"))
+    with app.test_client() as client:
+        dates = []
+        for page in range(1, -(-total // 10) + 1):
+            response = client.get(f"/results/outdoors?sort=date&per_page=10&page={page}")
+            assert response.status_code == 200
+            dates += re.findall(r"<td>(\d{4}-\d{2}-\d{2})</td>", response.data.decode())
+        assert len(dates) == total
+        assert dates == sorted(dates, reverse=True)
+
+        assert client.get(f"/results/outdoors?per_page=10&page={page + 1}").status_code == 404
+        assert client.get("/results/outdoors?sort=nonsense").status_code == 404
+
+def test_results_stream_every_row():
+    total = len(history.read("outdoors"))
+    with app.test_client() as client:
+        response = client.get("/results/outdoors?sort=date&page=all")
+        assert response.status_code == 200
+        assert response.is_streamed
+        dates = re.findall(r"<td>(\d{4}-\d{2}-\d{2})</td>", response.data.decode())
+        assert len(dates) == total
+        assert dates == sorted(dates, reverse=True)
+
+def test_api_export_filters():
+    with app.test_client() as client:
+        response = client.get(
+            "/api/export/outdoors?format=ndjson&columns=date,golds"
+            "&distance=30&distance=40&is_comp=0&from=2023-05-01&years=2023")
+        assert response.status_code == 200
+        assert response.is_streamed
+        rows = [json.loads(line) for line in response.data.decode().splitlines()]
+
+        score_data = history.read("outdoors")
+        expected = score_data[
+            score_data.distance.astype(float).isin([30, 40]) & 
+            (score_data.is_comp == 0) & (score_data.date >= "2023-05-01")]
+        assert len(rows) == len(expected) > 0
+        assert set(rows[0]) == {"date", "golds"}
+
+        response = client.get("/api/export/outdoors?years=1999")
+        assert response.data.decode() == ",".join(COLUMNS) + "\n"
+        # Two digit years as the partitions are named
+        lines = client.get("/api/export/outdoors?years=23").data.decode().splitlines()
+        assert len(lines) == len(score_data) + 1
+        assert client.get("/api/export/outdoors?years=223").status_code == 400
+        assert client.get("/api/export/outdoors?columns=nonsense").status_code == 400
+        assert client.get("/api/export/outdoors?to=yesterday").status_code == 400
+        # A filter which can't be read is an error rather than no filter
+        for query in ["is_comp=yes", "is_comp=7", "distance=abc", "distance=30&distance=x"]:
+            assert client.get(f"/api/export/outdoors?{query}").status_code == 400
+
+def test_api_predict_one_score_archer(tmp_path, monkeypatch):
+    # Saved models are kept out of the way so the model is trained here
+    monkeypatch.setitem(app.config, "MODEL_DIR", str(tmp_path))
+    row = {"arrow_average": 8.5, "distance": 30.0, "date": date(2023, 5, 1),
+           "golds": 20, "arrows": 36, "is_comp": 0}
+    writer.write("outdoors", "23", [row], "one-score")
+    try:
+        with app.test_client() as client:
+            response = client.post("/api/predict", json={
+                "archer": "one-score", "distances": [30], "dates": "2023-05-01"})
+            assert response.status_code == 200
+            assert len(response.get_json()["avg_score"]) == 1
+    finally:
+        shutil.rmtree(store.archer_root("one-score"))
+
+def test_add_score_after_another_worker(monkeypatch):
+    monkeypatch.setitem(app.config, "WTF_CSRF_ENABLED", False)
+    row = {"arrow_average": 8.5, "distance": 30.0, "date": date(2023, 5, 1),
+           "golds": 20, "arrows": 36, "is_comp": 0}
+    writer.write("outdoors", "23", [row, row], "two-workers")
+    try:
+        with app.test_client() as client:
+            def counted():
+                summary = client.get(
+                    "/api/summary/outdoors?archer=two-workers").get_json()["summary"]
+                return sum(entry["count"] for entry in summary)
+            assert counted() == 2
+            # Another worker's score, then one through this worker
+            CsvScoreStore("static").append("outdoors", "23", [row], "two-workers")
+            response = client.post("/add_score", data={
+                "archer": "two-workers", "season": "outdoors", "arrow_average": "8.5",
+                "distance": "30", "units": "1", "date": "2023-05-02", "golds": "20",
+                "total_arrows": "36", "is_comp": "0"})
+            assert response.status_code == 302
+            assert counted() == 4
+    finally:
+        shutil.rmtree(store.archer_root("two-workers"))
+
+def test_api_import_write_fails(monkeypatch):
+    def write_scores(*args):
+        raise OSError("store unavailable")
+    monkeypatch.setattr("bulk.write_scores", write_scores)
+    before = history.token("outdoors", "default")
+    loaded = {key: models.peek(key) for key in models.keys()}
+    with app.test_client() as client:
+        response = client.post(
+            "/api/import/outdoors?format=csv",
+            data="arrow_average,distance,date,golds,arrows\n8.5,30,2023-05-01,20,36\n")
+        assert response.status_code == 503
+        assert "unavailable" in response.get_json()["error"]
+    assert history.token("outdoors", "default") == before
+    assert {key: models.peek(key) for key in models.keys()} == loaded
@@ -0,0 +1,73 @@
+# USAGE
+# pytest -v --no-header tests/test_bulk.py
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from bulk import read_upload, validate_batch, write_scores
+from export import encode
+from store import CsvScoreStore, open_store
+from training import train
+
+# ---
+
+UPLOAD = """arrow_average,distance,date,golds,arrows,is_comp,units
+8.78,30,2023-04-16,32,36,0,1
+7.63,60,2024-05-28,23,48,1,1.09361
+"""
+
+def test_validate_batch_rules():
+    batch = pd.DataFrame({
+        "arrow_average": ["9.5", "10.5", "x", "8"],
+        "distance": ["30", "30", "25", "70"],
+        "date": ["2023-04-16", "2023-04-16", "2023-02-30", "2023-04-16"],
+        "golds": ["30", "30", "30", "0"],
+        "arrows": ["36", "36", "36", "36"],
+        "units": ["1", "1", "1", "1.09361"],
+    })
+    scores, errors = validate_batch(batch, first_row=11)
+    assert sorted({row for row, _ in errors}) == [12, 13, 14]
+    assert len([row for row, _ in errors if row == 13]) == 3
+    assert scores.is_comp.tolist() == [0, 0, 0, 0]
+    assert scores.distance.iloc[3] == pytest.approx(70 * 1.09361)
+
+    with pytest.raises(ValueError):
+        validate_batch(batch.drop(columns=["golds"]))
+
+@pytest.mark.parametrize("backend", ["csv", "sqlite"])
+def test_import_writes_every_year(tmp_path, backend):
+    store = open_store(backend, tmp_path)
+    scores, errors, failed = read_upload(io.StringIO(UPLOAD), batch_rows=1)
+    assert (errors, failed) == ([], 0)
+
+    assert write_scores(store, "outdoors", scores, "robin") == {"23": 1, "24": 1}
+    assert store.partitions("outdoors", "robin") == [("outdoors", "23"), ("outdoors", "24")]
+    frame = store.read("outdoors", archer="robin")
+    assert frame.golds.tolist() == [32, 23]
+    assert frame.distance.astype(float).tolist() == pytest.approx([30, 65.62], abs=0.01)
+
+def test_import_reads_an_export(tmp_path):
+    # Only the score in yards, as exports have every distance in yards
+    store = CsvScoreStore(tmp_path)
+    write_scores(store, "outdoors", read_upload(io.StringIO(UPLOAD))[0][:1])
+    exported = "".join(encode(store.read_chunks("outdoors"), "ndjson"))
+    scores, errors, failed = read_upload(io.StringIO(exported), "ndjson")
+    assert failed == 0
+    assert scores.arrow_average.tolist() == [8.78]
+
+def test_add_scores_matches_add_score():
+    score_data = CsvScoreStore("static").read("outdoors")
+    new = read_upload(io.StringIO(UPLOAD))[0]
+    one_by_one, at_once = train(score_data), train(score_data)
+    for row in new.to_dict("records"):
+        one_by_one.add_score(row)
+    at_once.add_scores(new)
+    assert np.allclose(one_by_one.model.coef_, at_once.model.coef_)
+    assert one_by_one.latest_day == at_once.latest_day
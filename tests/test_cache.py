@@ -0,0 +1,63 @@
+# USAGE
+# pytest -v --no-header tests/test_cache.py
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from cache import LRUCache, FrameCache
+
+# ---
+
+def test_LRUCache_evicts_least_recently_used():
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert "a" in cache
+    assert "b" not in cache
+    assert "c" in cache
+
+def test_LRUCache_size_cap():
+    cache = LRUCache(10, sizeof=len)
+    cache.put("a", "xxxxxx")
+    cache.put("b", "xxxxxx")
+    assert len(cache) == 1
+    assert cache.total_size == 6
+    # Larger than the whole cache --> never stored
+    cache.put("c", "x" * 11)
+    assert "c" not in cache
+
+def test_FrameCache_reloads_on_change(tmp_path):
+    path = tmp_path / "scores.csv"
+    path.write_text("arrow_average,distance\n9.0,20")
+    loads = []
+    def loader():
+        loads.append(1)
+        return pd.read_csv(path)
+
+    cache = FrameCache(1024 * 1024)
+    assert len(cache.get("key", "token", loader)) == 1
+    assert len(cache.get("key", "token", loader)) == 1
+    assert len(loads) == 1
+
+    with open(path, "a") as file:
+        file.write("\n8.5,30")
+    cache.bump("key")
+    assert len(cache.get("key", "token", loader)) == 2
+    assert len(cache.get("key", "new token", loader)) == 2
+    assert len(loads) == 3
+
+def test_FrameCache_bump_during_load():
+    cache = FrameCache(1024 * 1024)
+    def loader():
+        # Another thread writes a score while this one reads
+        cache.bump("key")
+        return pd.DataFrame({"golds": [1]})
+    cache.get("key", "token", loader)
+    loads = []
+    cache.get("key", "token", lambda: loads.append(1) or pd.DataFrame({"golds": [1, 2]}))
+    assert loads == [1]
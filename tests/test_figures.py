@@ -0,0 +1,41 @@
+# USAGE
+# pytest -v --no-header tests/test_figures.py
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from aggregate import Aggregates
+from figures import FIGURES, render
+from store import CsvScoreStore
+from training import add_derived_columns
+
+# ---
+
+SCORES = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static")
+PNG = b"\x89PNG\r\n\x1a\n"
+
+def make_scores():
+    return add_derived_columns(CsvScoreStore(SCORES).read("outdoors", ["23"]))
+
+@pytest.mark.parametrize("name", list(FIGURES))
+def test_render_density(name):
+    score_data = make_scores()
+    image = render(name, score_data, Aggregates(score_data), dpi=40, density=True)
+    assert image.startswith(PNG)
+
+def test_render_density_keeps_hue():
+    score_data = make_scores()
+    aggregates = Aggregates(score_data)
+    by_day, by_month = (
+        render(name, score_data, aggregates, dpi=40, density=True)
+        for name in ["day_of_week_fig", "month_fig"])
+    assert by_day != by_month
+
+def test_render_unknown_figure():
+    score_data = make_scores()
+    with pytest.raises(ValueError):
+        render("nonsense", score_data, Aggregates(score_data))
@@ -0,0 +1,48 @@
+# USAGE
+# pytest -v --no-header tests/test_grid.py
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from forms import distances
+from grid import GridCache, PredictionGrid
+from store import CsvScoreStore
+from training import train
+
+# ---
+
+SCORES = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static")
+UNITS = [1, 1.09361]
+
+def make_trained():
+    return train(CsvScoreStore(SCORES).read("outdoors", ["23"]))
+
+def test_PredictionGrid_matches_model():
+    trained = make_trained()
+    grid = PredictionGrid(trained, distances, UNITS, horizon=30)
+    for distance in [20, 70 * 1.09361]:
+        for days in [trained.latest_day - 30, trained.latest_day, trained.latest_day + 30]:
+            for is_comp in [False, True]:
+                expected = trained.model.predict([[distance, days, is_comp]])[0]
+                assert np.allclose(grid.lookup(distance, days, is_comp), expected)
+
+def test_PredictionGrid_off_grid():
+    trained = make_trained()
+    grid = PredictionGrid(trained, distances, UNITS, horizon=30)
+    assert grid.lookup(25, trained.latest_day, False) is None
+    assert grid.lookup(20, trained.latest_day + 31, False) is None
+
+def test_GridCache_rebuilds_when_model_changes():
+    trained = make_trained()
+    grids = GridCache(distances, UNITS, horizon=30)
+    grid = grids.get("key", trained)
+    assert grids.get("key", trained) is grid
+    trained.add_score({"arrow_average": 9.5, "distance": 20.0, "date": "2023-09-10",
+                       "golds": 30, "arrows": 36, "is_comp": 0})
+    new_grid = grids.get("key", trained)
+    assert new_grid is not grid
+    assert new_grid.latest_day == trained.latest_day
@@ -0,0 +1,54 @@
+# USAGE
+# pytest -v --no-header tests/test_history.py
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datetime import date
+
+from history import ScoreHistory
+from store import CsvScoreStore
+
+# ---
+
+def row(on_date, average=8.5):
+    return {"arrow_average": average, "distance": 30, "date": on_date,
+            "golds": 30, "arrows": 36, "is_comp": 0}
+
+def make_history(tmp_path):
+    store = CsvScoreStore(tmp_path)
+    store.append("outdoors", "23", [row(date(2023, 4, 16)), row(date(2023, 5, 1))])
+    store.append("outdoors", "24", [row(date(2024, 4, 16))])
+    reads = []
+    read = store.read
+    store.read = lambda *args, **kwargs: reads.append(args[1]) or read(*args, **kwargs)
+    return ScoreHistory(store), store, reads
+
+def test_ScoreHistory_combines_years(tmp_path):
+    history, store, reads = make_history(tmp_path)
+    frame = history.read("outdoors")
+    assert len(frame) == 3
+    # Days are counted from the first score of any year
+    assert frame.days_since_first_entry.tolist() == [0, 15, 366]
+    assert history.read("outdoors") is frame
+
+def test_ScoreHistory_rereads_changed_year(tmp_path):
+    history, store, reads = make_history(tmp_path)
+    history.read("outdoors")
+    store.append("outdoors", "24", [row(date(2024, 5, 1))])
+    history.bump("outdoors", "24")
+    assert len(history.read("outdoors")) == 4
+    assert reads == [["23"], ["24"], ["24"]]
+
+def test_ScoreHistory_empty(tmp_path):
+    history = ScoreHistory(CsvScoreStore(tmp_path))
+    assert history.token("indoors") is None
+    assert len(history.read("indoors")) == 0
+
+def test_ScoreHistory_keeps_schema_across_years(tmp_path):
+    history, store, reads = make_history(tmp_path)
+    store.append("outdoors", "24", [dict(row(date(2024, 5, 1)), distance=60)])
+    frame = history.read("outdoors")
+    assert frame.distance.dtype == "category"
+    assert sorted(frame.distance.cat.categories) == [30, 60]
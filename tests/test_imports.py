@@ -0,0 +1,29 @@
+# USAGE
+# pytest -v --no-header tests/test_imports.py
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# ---
+
+def loaded_modules(module):
+    result = subprocess.run(
+        [sys.executable, "-c",
+         f"import sys, {module}; print(' '.join(sys.modules))"],
+        cwd=ROOT, capture_output=True, text=True, check=True)
+    return set(result.stdout.split())
+
+def test_app_import_is_light():
+    loaded = loaded_modules("app")
+    for heavy in ["pandas", "sklearn", "matplotlib", "seaborn", "pyarrow"]:
+        assert heavy not in loaded
+
+def test_plot_import_is_light():
+    loaded = loaded_modules("plot")
+    for heavy in ["pandas", "matplotlib", "seaborn"]:
+        assert heavy not in loaded
@@ -0,0 +1,27 @@
+# USAGE
+# pytest -v --no-header tests/test_plot.py
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aggregate import Aggregates
+from plot import plot_figures
+from store import CsvScoreStore
+from training import add_derived_columns
+
+# ---
+
+SCORES = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static")
+
+def test_plot_figures_in_pool(tmp_path):
+    score_data = add_derived_columns(CsvScoreStore(SCORES).read("outdoors", ["23"]))
+    paths = plot_figures(score_data, Aggregates(score_data),
+                         ["distance_fig", "arrows_per_day"], dpi=40,
+                         directory=str(tmp_path), workers=2)
+    assert sorted(os.path.basename(path) for path in paths) == \
+        ["arrows_per_day.png", "distance_fig.png"]
+    for path in paths:
+        with open(path, "rb") as file:
+            assert file.read(8) == b"\x89PNG\r\n\x1a\n"
@@ -0,0 +1,111 @@
+# USAGE
+# pytest -v --no-header tests/test_registry.py
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from registry import ModelRegistry
+
+# ---
+
+class FakeHistory:
+    def __init__(self):
+        self.tokens = {}
+
+    def token(self, season, archer):
+        return self.tokens.get((season, archer))
+
+class FakeModel:
+    def __init__(self, key):
+        self.key = key
+        self.rows = []
+
+    def add_score(self, row):
+        self.rows.append(row)
+
+class FakeScheduler:
+    def __init__(self):
+        self.notified = []
+
+    def notify(self, key):
+        self.notified.append(key)
+
+def make_registry(max_models=8):
+    loads = []
+    def loader(season, features, archer):
+        loads.append((season, archer))
+        return FakeModel((season, archer, len(loads)))
+    return ModelRegistry(FakeHistory(), loader, max_models), loads
+
+def test_ModelRegistry_is_lazy():
+    registry, loads = make_registry()
+    assert loads == []
+    first = registry.get("outdoors", ["distance"])
+    assert registry.get("outdoors", ["distance"]) is first
+    assert loads == [("outdoors", "default")]
+
+def test_ModelRegistry_is_bounded():
+    registry, loads = make_registry(max_models=2)
+    for season in ["outdoors", "indoors", "field"]:
+        registry.get(season, ["distance"])
+    assert len(registry) == 2
+    registry.get("outdoors", ["distance"])
+    assert len(loads) == 4
+
+def test_ModelRegistry_notifies_scheduler():
+    registry, loads = make_registry()
+    registry.scheduler = FakeScheduler()
+    model = registry.get("outdoors", ["distance"])
+    registry.history.tokens[("outdoors", "default")] = "changed"
+    # The old model is served until the scheduler swaps in a new one
+    assert registry.get("outdoors", ["distance"]) is model
+    assert registry.scheduler.notified == [("outdoors", ("distance",), "default")]
+
+def test_ModelRegistry_observe():
+    registry, loads = make_registry()
+    registry.scheduler = FakeScheduler()
+    model = registry.get("outdoors", ["distance"])
+    registry.history.tokens[("outdoors", "default")] = "written"
+    registry.observe("outdoors", {"distance": 20}, None)
+    registry.observe("indoors", {"distance": 20}, None)
+    assert model.rows == [{"distance": 20}]
+    # Already up to date, so no retrain is needed
+    assert registry.get("outdoors", ["distance"]) is model
+    assert len(loads) == 1
+    assert registry.scheduler.notified == []
+
+def test_ModelRegistry_observe_keeps_stale_models_stale():
+    registry, loads = make_registry()
+    registry.scheduler = FakeScheduler()
+    model = registry.get("outdoors", ["distance"])
+    # Another worker wrote "theirs" after the model was loaded, then this
+    # worker wrote "ours"
+    registry.history.tokens[("outdoors", "default")] = "ours"
+    registry.observe("outdoors", {"distance": 20}, "theirs")
+    assert model.rows == []
+    # Their score is still missing, so the model must be refit
+    assert registry.get("outdoors", ["distance"]) is model
+    assert registry.scheduler.notified == [("outdoors", ("distance",), "default")]
+
+def test_ModelRegistry_observe_after_swap():
+    registry, loads = make_registry()
+    registry.get("outdoors", ["distance"])
+    key = ("outdoors", ("distance",), "default")
+    # A refit trained on the new score finishes between the write and observe()
+    registry.history.tokens[("outdoors", "default")] = "written"
+    refit = FakeModel("refit")
+    registry.swap(key, "written", refit)
+    registry.observe("outdoors", {"distance": 20}, None)
+    # The score is not counted twice
+    assert refit.rows == []
+    assert registry.peek(key) == ("written", refit)
+
+def test_ModelRegistry_per_archer():
+    registry, loads = make_registry()
+    mine = registry.get("outdoors", ["distance"], "robin")
+    theirs = registry.get("outdoors", ["distance"], "alex")
+    assert mine is not theirs
+    registry.observe("outdoors", {"distance": 20}, None, "robin")
+    assert mine.rows == [{"distance": 20}]
+    assert theirs.rows == []
@@ -0,0 +1,71 @@
+# USAGE
+# pytest -v --no-header tests/test_regression.py
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pytest
+from sklearn import linear_model
+
+from regression import IncrementalRegression, SklearnRegression, make_regressor
+
+# ---
+
+rng = np.random.default_rng(864)
+X = np.column_stack([
+    rng.choice([20, 30, 50, 60], 40),
+    rng.integers(0, 150, 40),
+    rng.integers(0, 2, 40),
+]).astype(float)
+y = np.column_stack([
+    9.5 - 0.02 * X[:, 0] + 0.003 * X[:, 1] + rng.normal(0, 0.1, 40),
+    90 - 0.5 * X[:, 0] + rng.normal(0, 2, 40),
+])
+
+def test_fit_matches_sklearn():
+    expected = linear_model.LinearRegression().fit(X, y)
+    model = IncrementalRegression().fit(X, y)
+    assert np.allclose(model.coef_, expected.coef_)
+    assert np.allclose(model.intercept_, expected.intercept_)
+    assert np.isclose(model.score(X, y), expected.score(X, y))
+
+def test_partial_fit_matches_full_fit():
+    model = IncrementalRegression().fit(X[:30], y[:30])
+    for row, target in zip(X[30:], y[30:]):
+        model.partial_fit(row, target)
+    expected = IncrementalRegression().fit(X, y)
+    assert model.n_samples == 40
+    assert np.allclose(model.predict(X), expected.predict(X))
+
+def test_partial_fit_changes_version():
+    model = IncrementalRegression().fit(X, y)
+    version = model.version
+    model.partial_fit(X[0], y[0])
+    assert model.version != version
+    assert IncrementalRegression().fit(X, y).version not in (0, version, model.version)
+
+def test_constant_feature_matches_sklearn():
+    # No competition entries --> is_comp column has no variance
+    X_no_comp = X.copy()
+    X_no_comp[:, 2] = 0
+    expected = linear_model.LinearRegression().fit(X_no_comp, y)
+    model = IncrementalRegression().fit(X_no_comp, y)
+    assert np.allclose(model.predict(X_no_comp), expected.predict(X_no_comp))
+
+def test_backends_agree():
+    numpy_model = make_regressor("numpy").fit(X[:30], y[:30]).partial_fit(X[30:], y[30:])
+    sklearn_model = make_regressor("sklearn").fit(X[:30], y[:30]).partial_fit(X[30:], y[30:])
+    assert isinstance(sklearn_model, SklearnRegression)
+    assert np.allclose(numpy_model.predict(X), sklearn_model.predict(X))
+    assert np.isclose(numpy_model.score(X, y), sklearn_model.score(X, y))
+
+def test_SklearnRegression_state_round_trip():
+    model = SklearnRegression().fit(X, y)
+    restored = SklearnRegression.from_state(model.state())
+    assert np.allclose(restored.predict(X), model.predict(X))
+
+def test_make_regressor_unknown_backend():
+    with pytest.raises(ValueError):
+        make_regressor("statsmodels")
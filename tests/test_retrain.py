@@ -0,0 +1,74 @@
+# USAGE
+# pytest -v --no-header tests/test_retrain.py
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from registry import ModelRegistry
+from regression import IncrementalRegression
+from retrain import RetrainScheduler
+
+# ---
+
+KEY = ("outdoors", ("distance",), "default")
+
+class FakeHistory:
+    def __init__(self):
+        self.token_value = 0
+
+    def token(self, season, archer):
+        return self.token_value
+
+class FakeTrained:
+    def __init__(self, slope):
+        X = np.arange(10, dtype=float).reshape(-1, 1)
+        self.model = IncrementalRegression().fit(X, slope * X)
+        self.X_test = X
+        self.y_test = 2 * X
+
+def make_scheduler(slopes):
+    slopes = iter(slopes)
+    registry = ModelRegistry(
+        FakeHistory(), lambda *key: FakeTrained(next(slopes)))
+    registry.get(*KEY)
+    return RetrainScheduler(registry, debounce=1, max_wait=5), registry
+
+def test_poll_debounces_changes():
+    scheduler, registry = make_scheduler([2])
+    assert scheduler.poll(now=0) == []
+    registry.history.token_value = 1
+    assert scheduler.poll(now=0) == []
+    registry.history.token_value = 2
+    assert scheduler.poll(now=0.5) == []
+    assert scheduler.poll(now=1.6) == [KEY]
+
+def test_poll_max_wait():
+    scheduler, registry = make_scheduler([2])
+    for now in range(6):
+        registry.history.token_value = now + 1
+        due = scheduler.poll(now=now)
+    assert due == [KEY]
+
+def test_retrain_swaps_valid_model():
+    scheduler, registry = make_scheduler([1, 2])
+    old = registry.peek(KEY)[1]
+    registry.history.token_value = 1
+    scheduler.retrain(KEY)
+    token, new = registry.peek(KEY)
+    assert new is not old
+    assert token == 1
+    assert scheduler.swaps == 1
+
+def test_retrain_rejects_worse_model():
+    scheduler, registry = make_scheduler([2, -5])
+    old = registry.peek(KEY)[1]
+    registry.history.token_value = 1
+    scheduler.retrain(KEY)
+    token, current = registry.peek(KEY)
+    assert current is old
+    # Not retried until the scores change again
+    assert token == 1
+    assert scheduler.rejected == 1
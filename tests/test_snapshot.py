@@ -0,0 +1,44 @@
+# USAGE
+# pytest -v --no-header tests/test_snapshot.py
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from snapshot import load_or_build, snapshot_key
+from store import CsvScoreStore
+from training import TrainedModel, train
+
+# ---
+
+SCORES = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static")
+
+def test_load_or_build_only_builds_once(tmp_path):
+    builds = []
+    def build():
+        builds.append(1)
+        return {"x": np.arange(3)}
+
+    first = load_or_build(tmp_path, "model", "abc", build)
+    second = load_or_build(tmp_path, "model", "abc", build)
+    assert len(builds) == 1
+    assert np.array_equal(first["x"], second["x"])
+
+def test_load_or_build_replaces_old_snapshot(tmp_path):
+    load_or_build(tmp_path, "model", "abc", lambda: {"x": np.arange(3)})
+    load_or_build(tmp_path, "model", "def", lambda: {"x": np.arange(4)})
+    assert len(os.listdir(tmp_path)) == 1
+
+def test_snapshot_key_changes_with_data():
+    assert snapshot_key("digest", 0.2) == snapshot_key("digest", 0.2)
+    assert snapshot_key("digest", 0.2) != snapshot_key("changed", 0.2)
+
+def test_TrainedModel_round_trip():
+    trained = train(CsvScoreStore(SCORES).read("outdoors", ["23"]))
+    loaded = TrainedModel.from_arrays(trained.to_arrays())
+    assert np.allclose(loaded.model.coef_, trained.model.coef_)
+    assert loaded.latest_day == trained.latest_day
+    assert loaded.most_recent_date == trained.most_recent_date == "2023-09-08"
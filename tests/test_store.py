@@ -0,0 +1,136 @@
+# USAGE
+# pytest -v --no-header tests/test_store.py
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datetime import date
+
+import pytest
+
+from store import SORTS, CsvScoreStore, open_store
+
+# ---
+
+ROWS = [
+    {"arrow_average": 8.78, "distance": 30, "date": date(2023, 4, 16),
+     "golds": 32, "arrows": 36, "is_comp": 0},
+    {"arrow_average": 7.63, "distance": 60, "date": date(2023, 5, 28),
+     "golds": 23, "arrows": 48, "is_comp": 1},
+]
+
+def test_CsvScoreStore_append_and_read(tmp_path):
+    store = CsvScoreStore(tmp_path)
+    store.append("outdoors", "23", ROWS[:1])
+    store.append("outdoors", "23", ROWS[1:])
+    assert store.partitions() == [("outdoors", "23")]
+    assert (tmp_path / "arrow_scores_outdoors_23.csv").read_text() == (
+        "arrow_average,distance,date,golds,arrows,is_comp\n"
+        '8.78,30.00,"2023-04-16",32,36,0\n'
+        '7.63,60.00,"2023-05-28",23,48,1')
+
+    frame = store.read("outdoors", ["23"], columns=["distance", "date"])
+    assert list(frame.columns) == ["distance", "date"]
+    assert frame.date.dt.year.tolist() == [2023, 2023]
+
+def test_CsvScoreStore_token_changes_on_append(tmp_path):
+    store = CsvScoreStore(tmp_path)
+    assert store.token("outdoors", "23") is None
+    store.append("outdoors", "23", ROWS[:1])
+    token = store.token("outdoors", "23")
+    store.append("outdoors", "23", ROWS[1:])
+    assert store.token("outdoors", "23") != token
+
+def test_ParquetScoreStore_imports_csv(tmp_path):
+    pytest.importorskip("pyarrow")
+    CsvScoreStore(tmp_path).append("outdoors", "23", ROWS)
+    CsvScoreStore(tmp_path).append("indoors", "24", ROWS[:1])
+
+    store = open_store("parquet", tmp_path)
+    assert store.partitions() == [("indoors", "24"), ("outdoors", "23")]
+    frame = store.read("outdoors", columns=["arrow_average", "is_comp"])
+    assert frame.arrow_average.tolist() == pytest.approx([8.78, 7.63])
+    assert frame.is_comp.tolist() == [0, 1]
+
+    # Importing again must not duplicate the rows
+    store = open_store("parquet", tmp_path)
+    assert len(store.read("outdoors")) == 2
+
+def test_ParquetScoreStore_append_and_compact(tmp_path):
+    pytest.importorskip("pyarrow")
+    store = open_store("parquet", tmp_path)
+    store.max_parts = 3
+    for _ in range(4):
+        store.append("indoors", "24", ROWS)
+    assert len(store._parts("indoors", "24")) == 1
+    frame = store.read("indoors", ["24"])
+    assert len(frame) == 8
+    assert str(frame.date.dtype).startswith("datetime64")
+
+@pytest.mark.parametrize("backend", ["csv", "parquet", "sqlite"])
+def test_store_partitions_by_archer(tmp_path, backend):
+    if backend == "parquet":
+        pytest.importorskip("pyarrow")
+    CsvScoreStore(tmp_path).append("outdoors", "23", ROWS, "robin")
+    store = open_store(backend, tmp_path)
+    store.append("outdoors", "23", ROWS[:1])
+
+    assert store.archers() == ["default", "robin"]
+    assert len(store.read("outdoors", ["23"])) == 1
+    assert len(store.read("outdoors", ["23"], archer="robin")) == 2
+    assert store.token("outdoors", "23", "alex") is None
+    assert len(store.read("outdoors", ["23"], archer="alex")) == 0
+    with pytest.raises(ValueError):
+        store.token("outdoors", "23", "../robin")
+
+def test_SqliteScoreStore_aggregates_like_pandas(tmp_path):
+    from aggregate import Aggregates
+    from training import add_derived_columns
+
+    CsvScoreStore(tmp_path).append("outdoors", "23", ROWS + ROWS[:1])
+    store = open_store("sqlite", tmp_path)
+    token = store.token("outdoors", "23")
+    store.append("outdoors", "24", ROWS[1:])
+    assert store.partitions() == [("outdoors", "23"), ("outdoors", "24")]
+    assert store.token("outdoors", "23") == token
+
+    frame = add_derived_columns(store.read("outdoors"))
+    expected = Aggregates(frame)
+    aggregates = Aggregates.from_base(store.aggregate("outdoors"))
+    assert aggregates.rows == expected.rows == 4
+    for keys in [["distance"], ["year", "month"]]:
+        assert aggregates.mean(keys, ["arrow_average", "golds_pct"]).to_numpy() == \
+            pytest.approx(expected.mean(keys, ["arrow_average", "golds_pct"]).to_numpy())
+        assert aggregates.count(keys).tolist() == expected.count(keys).tolist()
+
+@pytest.mark.parametrize("backend", ["csv", "parquet", "sqlite"])
+def test_store_read_chunks(tmp_path, backend):
+    if backend == "parquet":
+        pytest.importorskip("pyarrow")
+    store = open_store(backend, tmp_path)
+    store.append("outdoors", "23", ROWS)
+    store.append("outdoors", "24", ROWS[:1])
+
+    chunks = list(store.read_chunks(
+        "outdoors", columns=["date", "golds"], chunk_rows=1))
+    assert [len(chunk) for chunk in chunks] == [1, 1, 1]
+    assert [chunk.golds.iloc[0] for chunk in chunks] == [32, 23, 32]
+    assert list(chunks[0].columns) == ["date", "golds"]
+    assert len(list(store.read_chunks("outdoors", ["24"]))) == 1
+
+@pytest.mark.parametrize("sort", list(SORTS))
+def test_SqliteScoreStore_read_sorted_matches_pandas(tmp_path, sort):
+    store = open_store("sqlite", tmp_path)
+    store.append("outdoors", "23", ROWS + ROWS[:1] + [dict(ROWS[1], golds=30)])
+    store.append("outdoors", "24", ROWS[1:])
+    by, ascending = SORTS[sort]
+    expected = store.read("outdoors").sort_values(
+        by=by, ascending=ascending, kind="stable").golds.tolist()
+
+    assert store.count("outdoors") == 5
+    assert store.read_sorted("outdoors", sort).golds.tolist() == expected
+    pages = [store.read_sorted("outdoors", sort, offset, 2) for offset in [0, 2, 4]]
+    assert [golds for page in pages for golds in page.golds] == expected
+    chunks = store.read_sorted_chunks("outdoors", sort, chunk_rows=2)
+    assert [golds for chunk in chunks for golds in chunk.golds] == expected
@@ -0,0 +1,69 @@
+# USAGE
+# pytest -v --no-header tests/test_writer.py
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from store import CsvScoreStore
+from writer import ScoreWriter
+
+# ---
+
+def make_row(i):
+    return {"arrow_average": 9.0, "distance": 20, "date": "2023-09-05",
+            "golds": i, "arrows": 60, "is_comp": 0}
+
+def test_ScoreWriter_batches_rows(tmp_path):
+    store = CsvScoreStore(tmp_path)
+    appends = []
+    append = store.append
+    store.append = lambda *args: appends.append(1) or append(*args)
+
+    writer = ScoreWriter(store, window=0.2)
+    futures = [writer.submit("indoors", "23", [make_row(i)]) for i in range(10)]
+    assert [future.result(5) for future in futures] == [1] * 10
+    assert len(appends) == 1
+    assert len(store.read("indoors", ["23"])) == 10
+
+def test_ScoreWriter_concurrent_threads(tmp_path):
+    writer = ScoreWriter(CsvScoreStore(tmp_path))
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(
+            lambda i: writer.write("indoors", "23", [make_row(i)]), range(100)))
+    frame = CsvScoreStore(tmp_path).read("indoors", ["23"])
+    assert sorted(frame.golds) == list(range(100))
+
+def write_rows(root, start):
+    writer = ScoreWriter(CsvScoreStore(root))
+    for i in range(start, start + 25):
+        writer.write("indoors", "23", [make_row(i)])
+
+def test_ScoreWriter_concurrent_processes(tmp_path):
+    context = multiprocessing.get_context("fork")
+    processes = [
+        context.Process(target=write_rows, args=(tmp_path, start))
+        for start in range(0, 100, 25)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    frame = CsvScoreStore(tmp_path).read("indoors", ["23"])
+    assert sorted(frame.golds) == list(range(100))
+
+def test_ScoreWriter_fails_futures_when_locking_fails(tmp_path):
+    class BrokenLockStore(CsvScoreStore):
+        def lock(self):
+            raise OSError("lock file is unavailable")
+
+    writer = ScoreWriter(BrokenLockStore(tmp_path))
+    with pytest.raises(OSError, match="unavailable"):
+        writer.write("outdoors", "23", [make_row(1)], timeout=5)
+    # The thread survives to write the next batch
+    writer.store = CsvScoreStore(tmp_path)
+    assert writer.write("outdoors", "23", [make_row(1)], timeout=5) == 1
@@ -0,0 +1,162 @@
+import numpy as np
+
+from regression import BACKENDS, make_regressor
+
+# Select features to predict FROM and features to predict TO
+FEATURES = ["distance", "days_since_first_entry", "is_comp"]
+TARGETS = ["arrow_average", "golds_pct"]
+
+# Train / test split parameters
+# Part of the snapshot key, so changing them forces a refit
+TEST_SIZE = 0.2
+RANDOM_STATE = 864
+# Fewer scores than this are all trained on, with nothing held out, as the
+# split would leave too little (or nothing) to train on
+MIN_SPLIT_ROWS = 5
+
+#########################
+## DATA PRE-PROCESSING ##
+#########################
+
+# Returns a new frame, so frames shared through a cache are left unchanged
+# Each column is stored in the narrowest type which holds it
+def add_derived_columns(score_data):
+    import pandas as pd
+    return score_data.assign(
+        # Column of the calculated percent of gold arrows (arrows scoring >9)
+        golds_pct = (score_data.golds / score_data.arrows * 100).astype("float32"),
+
+        # Column indicating the time elapsed since the first entry
+        # This is used as a feature to show progress over time
+        days_since_first_entry = pd.to_numeric(
+            (score_data.date - score_data.date.min()).dt.days, downcast="integer"),
+
+        # Dataframe column converting the datetime object to a day of
+        # week string
+        day_of_week = score_data.date.dt.day_of_week.astype("int8"),
+    )
+
+###################
+## LIN REG MODEL ##
+###################
+
+# A fitted model along with what is needed to make predictions from it
+class TrainedModel:
+
+    def __init__(self, model, features, first_entry_date, latest_day,
+                 train_score, test_score, X_test, y_test):
+        self.model = model
+        self.features = list(features)
+        # Date of the first entry, day 0 of 'days_since_first_entry'
+        self.first_entry_date = first_entry_date
+        # Days since first entry of the most recent score
+        self.latest_day = latest_day
+        self.train_score = train_score
+        self.test_score = test_score
+        # Held-out testing subset, kept to validate later refits
+        self.X_test = X_test
+        self.y_test = y_test
+
+    # Get the most recent entry to the .csv file.
+    # This is displayed in "index.html" for the user to calculate the
+    # desired days till feature since this date.
+    @property
+    def most_recent_date(self):
+        return (self.first_entry_date + np.timedelta64(self.latest_day, "D")) \
+            .astype("datetime64[D]").item().strftime("%Y-%m-%d")
+
+    # Add a single new score (a row as written to the store) to the model's
+    # running statistics
+    # O(features^2) so this is cheap enough to call from within a request
+    def add_score(self, row):
+        on_date = np.datetime64(row["date"], "D")
+        days = int((on_date - self.first_entry_date).astype(int))
+        derived = {
+            **row,
+            "golds_pct": (row["golds"] / row["arrows"])*100,
+            "days_since_first_entry": days,
+            "day_of_week": on_date.item().weekday(),
+        }
+        self.model.partial_fit(
+            [[float(derived[feature]) for feature in self.features]],
+            [[float(derived[target]) for target in TARGETS]])
+        self.latest_day = max(self.latest_day, days)
+
+    # add_score() for a whole frame of rows at once, with a single update of
+    # the running statistics
+    def add_scores(self, score_data):
+        if not len(score_data):
+            return
+        dates = score_data.date.to_numpy("datetime64[D]")
+        days = (dates - self.first_entry_date).astype(int)
+        derived = score_data.assign(
+            golds_pct = score_data.golds / score_data.arrows * 100,
+            days_since_first_entry = days,
+            day_of_week = score_data.date.dt.day_of_week)
+        self.model.partial_fit(
+            derived[self.features].to_numpy(float),
+            derived[TARGETS].to_numpy(float))
+        self.latest_day = max(self.latest_day, int(days.max()))
+
+    # Plain arrays only so the snapshot can be loaded without pickle
+    def to_arrays(self):
+        return {
+            **self.model.state(),
+            "backend": np.array(self.model.backend),
+            "features": np.array(self.features),
+            "first_entry_date": np.datetime64(self.first_entry_date, "D"),
+            "latest_day": np.array(self.latest_day),
+            "train_score": np.array(self.train_score),
+            "test_score": np.array(self.test_score),
+            "X_test": self.X_test,
+            "y_test": self.y_test,
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        return cls(
+            BACKENDS[str(arrays["backend"])].from_state(arrays),
+            arrays["features"].tolist(),
+            arrays["first_entry_date"][()],
+            int(arrays["latest_day"]),
+            float(arrays["train_score"]),
+            float(arrays["test_score"]),
+            arrays["X_test"],
+            arrays["y_test"])
+
+# Fit a model to a frame of scores
+def train(score_data, features=FEATURES, backend="numpy"):
+    from sklearn.model_selection import train_test_split
+
+    score_data = add_derived_columns(score_data)
+    X = score_data[list(features)].to_numpy(dtype=float)
+    y = score_data[TARGETS].to_numpy(dtype=float)
+
+    # Split the data into training and testing subsets
+    # This ensures there is 'real' data left unseen by the model which can be
+    # used to score the models accuracy.
+    # THERE IS A DANGER HERE: if the 20% testing subset includes the very few datapoints with
+    # "is_comp" equal to 1 then the model will have no values to train this feature on.
+    # To resolve this issue I need more data, however this is obviously easier said than done...
+    if len(X) >= MIN_SPLIT_ROWS:
+        X_train, X_test, y_train, y_test = train_test_split(
+            X, y, test_size = TEST_SIZE, random_state = RANDOM_STATE)
+    else:
+        X_train, X_test, y_train, y_test = X, X[:0], y, y[:0]
+
+    # Creates the LinReg model and trains it with the training subset
+    # The default "numpy" model keeps running sums rather than the rows
+    # themselves so that add_score() can update it in place without a restart
+    model = make_regressor(backend)
+    model.fit(X_train, y_train)
+
+    # Score the model
+    # This is done on training AND testing data to highlight overfitting
+    return TrainedModel(
+        model,
+        features,
+        np.datetime64(min(score_data.date), "D"),
+        int(max(score_data.days_since_first_entry)),
+        model.score(X_train, y_train),
+        model.score(X_test, y_test) if len(X_test) else float("nan"),
+        X_test, y_test)
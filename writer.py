@@ -0,0 +1,88 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from store import DEFAULT_ARCHER
+
+##################
+## SCORE WRITER ##
+##################
+
+# Serialises writes to the score store across threads AND processes
+# Rows submitted within 'window' seconds of each other are grouped by
+# partition and written with a single append (and so a single fsync) while
+# holding the store's exclusive inter-process lock. Callers get a Future
+# which is resolved once their rows are on disk, so concurrent requests share
+# the cost of the fsync rather than queueing behind each other's.
+class ScoreWriter:
+
+    def __init__(self, store, window=0.005):
+        self.store = store
+        self.window = window
+        self._start_lock = threading.Lock()
+        self._queue = None
+        self._thread = None
+        self._pid = None
+
+    # Queue 'rows' for the (season, year, archer) partition
+    def submit(self, season, year, rows, archer=DEFAULT_ARCHER):
+        future = Future()
+        self._ensure_thread().put((season, year, archer, list(rows), future))
+        return future
+
+    # Queue 'rows' and wait until they have been written
+    def write(self, season, year, rows, archer=DEFAULT_ARCHER, timeout=None):
+        return self.submit(season, year, rows, archer).result(timeout)
+
+    # Threads do not survive a fork (eg. gunicorn workers), so the background
+    # thread is started on first use in each process
+    def _ensure_thread(self):
+        with self._start_lock:
+            if self._pid != os.getpid() or not self._thread.is_alive():
+                self._pid = os.getpid()
+                self._queue = queue.Queue()
+                self._thread = threading.Thread(
+                    target=self._run, args=(self._queue,), daemon=True)
+                self._thread.start()
+            return self._queue
+
+    def _run(self, pending):
+        while True:
+            batch = [pending.get()]
+            deadline = time.monotonic() + self.window
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(pending.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            # Nothing may stop the thread with callers still waiting, eg. if
+            # the lock file can't be opened, so every future gets the error
+            try:
+                self._flush(batch)
+            except Exception as error:
+                for *_, future in batch:
+                    if not future.done():
+                        future.set_exception(error)
+
+    def _flush(self, batch):
+        partitions = {}
+        for season, year, archer, rows, future in batch:
+            partition = partitions.setdefault((season, year, archer), ([], []))
+            partition[0].extend(rows)
+            partition[1].append((future, len(rows)))
+
+        with self.store.lock():
+            for (season, year, archer), (rows, futures) in partitions.items():
+                try:
+                    self.store.append(season, year, rows, archer)
+                except Exception as error:
+                    for future, _ in futures:
+                        future.set_exception(error)
+                else:
+                    for future, count in futures:
+                        future.set_result(count)